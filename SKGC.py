@@ -11,7 +11,13 @@ The script follows these main steps:
    saved to a file.
 
 Classes:
-    DualOutput: A class to handle simultaneous output to both the console and a file.
+    PublicationParseError: An error for an answer of the GPT agent that can't be parsed, even after the correction of
+    its format.
+
+    RateLimiter: A class to wait before a request to the OpenAI API only if the rate limits would be surpassed.
+
+    BatchDispatcher: A class to send the requests of all concurrently processed publications in waves to the Batch
+    API of OpenAI.
 
 Functions:
     user_selection_file_or_text() -> str: Asks the user to choose between reading publication data from a file or
@@ -28,19 +34,66 @@ Functions:
 
     list_to_comma_separated_string(in_list: List) -> str: Converts a list to a comma-separated string.
 
-    extract_topics_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]]) -> List[str]: Extracts
-    topics from a single publication.
+    normalize_topic_lists(topic_lists: List[List[str]]) -> List[List[str]]: Strips the topics of several topic lists
+    in one pass.
+
+    async extract_topics_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]]) -> List[str]:
+    Extracts topics from a single publication.
+
+    skip_semantic_cache(error: Exception): Skips the semantic cache for the rest of the run after a failed lookup or
+    store.
+
+    async extract_topics_batch(publications: List[Dict[str, Any]], messages_history: List[Dict[str, str]])
+    -> List[Optional[List[str]]]: Extracts the topics of several publications in one conversation.
+
+    parse_topics_batch(response: str, num_publications: int) -> List[Optional[List[str]]]: Parses the JSON answer of
+    the GPT agent about several publications.
+
+    async check_response_format(response: str, response_format: re.Pattern, prompt_template: str, placeholder: str)
+    -> str: Checks the output format of a GPT agent's answer and lets the GPT assistant correct it if needed.
+
+    split_ordered_lists(response: str, label: str) -> Tuple[List[str], List[str]]: Splits the answer of the GPT agent
+    with the two ordered keyword lists of the evaluation.
+
+    parse_matching_topics(response: str) -> int: Reads the count of the matching keywords from the structured answer of
+    the GPT agent.
+
+    normalize_keyword(keyword: str) -> str: Normalizes a keyword for the count of the matching keywords.
+
+    keywords_match(keyword1: str, keyword2: str) -> bool: Checks if two normalized keywords are similar.
+
+    count_matching_topics(topics: List[str], gold_standard: List[str]) -> int: Counts the matching and similar keywords
+    of two keyword lists.
+
+    async eval_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]], context_start: int): Evaluates
+    the topics extraction result for a single publication.
 
-    response_to_integer(response: str) -> int: Converts a string to an integer.
+    async eval_csoc_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]]): Evaluates the CSOC result
+    for a single publication in a separate conversation.
 
-    eval_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]]): Evaluates the topics extraction
-    result for a single publication.
+    progress_key(publication: Dict[str, Any]) -> str: Returns the key of a publication in the progress file.
 
-    extract_topics_all(publications: List[Dict[str, Any]], messages_history_all: List[List[Dict[str, str]]]) -> List[
-    Dict[str, Any]]: Extracts topics from all publications.
+    load_progress(file_name: str) -> Dict[str, Dict[str, Any]]: Reads the already evaluated publications of an
+    interrupted run.
 
-    eval_all(publications_and_topics: List[Dict[str, Any]], messages_history_all: List[List[Dict[str, str]]]) -> List[
-    Dict[str, Any]]: Evaluates all extracted topics.
+    async extract_topics_and_eval_all(publications: List[Dict[str, Any]], messages_history_all:
+    List[List[Dict[str, str]]], publications_per_prompt: int, progress_file_name: Optional[str]) ->
+    List[Dict[str, Any]]: Extracts and evaluates the topics of all publications concurrently.
+
+    start_background_logging() -> QueueListener: Moves the output of the log records to a background thread.
+
+    stop_background_logging(listener: QueueListener): Writes the remaining log records and moves the output of the
+    log records back to the calling thread.
+
+    get_max_concurrency(num_publications: int) -> int: Returns the number of publications that are processed
+    concurrently.
+
+    async run_pipeline(publications: List[Dict[str, Any]], messages_history_all: List[List[Dict[str, str]]],
+    use_batch_api: bool, publications_per_prompt: int, progress_file_name: Optional[str]) -> List[Dict[str, Any]]: Runs
+    the topic extraction and evaluation for all publications.
+
+    harmonic_mean_of_valid(values: np.ndarray) -> float: Computes the harmonic mean of the correct values of an
+    evaluation metric.
 
     print_eval_details(publications_and_topics: List[Dict[str, Any]]): Prints evaluation details to the console and
     optionally saves them to a file.
@@ -48,16 +101,48 @@ Functions:
     skgc_topics_and_eval_to_json(publications_and_topics: List[Dict[str, Any]]): Writes the evaluation results to a
     JSON file.
 
-    query_gpt_agent(prompt: str, messages_history: List[Dict[str, str]]) -> str: Queries the GPT Agent API with the
-    provided prompt.
+    get_openai_client(api_key_name: str) -> AsyncOpenAI: Returns the shared OpenAI client for the given API key.
+
+    async close_openai_clients(): Closes all OpenAI clients that were created during the run and their HTTP client.
+
+    parse_duration(duration: str) -> float: Converts a duration of the rate limit headers of the OpenAI API to seconds.
+
+    get_token_encoding(model: str) -> Optional[tiktoken.Encoding]: Returns the tokenizer of a model.
+
+    count_tokens(text: str, model: str) -> int: Counts the tokens of a text (cached).
+
+    estimate_tokens(messages: List[Dict[str, str]], model: str) -> int: Counts the tokens of the messages of a request.
+
+    get_retry_delay(error: Exception, attempt: int) -> float: Returns the waiting time before the next attempt of a
+    failed request.
+
+    retry_with_backoff(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]: Decorator that retries
+    failed requests to the OpenAI API with exponential backoff.
 
-    query_gpt_assistant(prompt: str) -> str: Queries the GPT Assistant API with the provided prompt.
+    async create_chat_completion(client: AsyncOpenAI, messages: List[Dict[str, str]], ...) -> str: Sends a request to
+    the chat completions API of OpenAI, using the response cache.
 
-    load_prompts_from_yaml(file_name: str) -> List[str]: Loads prompts from a YAML file.
+    async create_embedding(client: AsyncOpenAI, text: str) -> List[float]: Computes the embedding of a text.
+
+    async compact_context(messages: List[Dict[str, str]], model: str) -> List[Dict[str, str]]: Replaces the older
+    turns of a long request by a summary.
+
+    async query_gpt_agent(prompt: str, messages_history: List[Dict[str, str]], model: str, max_tokens: int,
+    context_start: int, response_format: Optional[Dict[str, Any]]) -> str: Queries the GPT Agent API with the provided
+    prompt.
+
+    async query_gpt_assistant(prompt: str) -> str: Queries the GPT Assistant API with the provided prompt.
+
+    load_prompts_from_yaml(file_name: str) -> Tuple[str, ...]: Loads prompts from a YAML file (once per file).
+
+    to_format_template(prompt: str) -> str: Converts a prompt with XXXnameXXX placeholders into a template for
+    str.format_map.
 
     print_messages_history(messages_history_all: List[List[Dict[str, str]]]): Prints all conversations about all
     selected publications.
 
+    parse_arguments() -> argparse.Namespace: Parses the command line arguments.
+
 Usage:
     Before running the script, please install the dependencies with the command pip install -r requirements.txt
 
@@ -67,80 +152,483 @@ Usage:
         API_KEY_ASSISTANT="[key]"
         ORGANIZATION="[id]"
     - prompts_gpt_agent.yaml: containing the prompts to the gpt agent for topic extraction in yaml format
+    - prompts_gpt_agent_batch.yaml: containing the prompts to the gpt agent for the topic extraction of several
+      publications at once in yaml format
     - prompts_gpt_assistant.yaml: containing the prompts to the gpt assistant for topic extraction in yaml format
     - prompts_gpt_agent_eval.yaml: containing the prompts to the gpt agent for evaluation in yaml format
     - prompts_gpt_assistant_eval.yaml: containing the prompts to the gpt agent for evaluation in yaml format
 
-    Adjust the waiting time between the calls to the OpenAI API according to your organization's usage tier and the
-    resulting TPM (tokens per minute) limit of the OpenAI API. For the default setting, the waiting time was set to 10
-    seconds based on the TPM limit for usage tier 1 of the GPT-4o model as of May 31st 2024,
-    which was 30,000. The message_history at the end of the extraction and evaluation pipeline in the present use case
-    is 4,500-5,500 tokens, former message_history objects are smaller, which is why 10s waiting time was chosen as a
-    safe limit. As the API usage tiers are assigned by OpenAI on organization level according to the API use, the
-    number of seconds can be adjusted according to the usage tier of the user's organization. Usage tier 2 for example
-    allows for 450,000 TPM which would enable to reduce the waiting time to 1s to be on the safe side.
+    Adjust the number of publications that are processed concurrently according to your organization's usage tier and
+    the resulting RPM (requests per minute) and TPM (tokens per minute) limits of the OpenAI API. The number can be set
+    with the environment variable SKGC_MAX_CONCURRENCY (e.g. in the .env file), the default is 8. The calls within the
+    conversation about one publication are sequential, only the comparison of the CSOC result with the gold standard
+    runs alongside in a separate conversation, so each concurrently processed publication has at most two requests in
+    flight. The message_history at the end of the extraction and evaluation pipeline in the present use case
+    is 4,500-5,500 tokens. For usage tier 1 of the GPT-4o model (30,000 TPM as of May 31st 2024), a value of 1 or 2 is
+    on the safe side, usage tier 2 (450,000 TPM) allows for the default value. There is no fixed waiting time between
+    the calls: the remaining requests and tokens are read from the rate limit headers of each response, and a request
+    waits only if it would surpass the limits. Requests that are still rejected because of a rate limit, or that fail
+    because of a connection problem or a server error, are retried up to 8 times with exponentially growing waiting
+    times (or the waiting time requested by the API). Own limits of the requests and tokens per minute (per model) can
+    be set with the environment variables SKGC_RPM_LIMIT and SKGC_TPM_LIMIT, the tokens of each call are counted with
+    the usage reported by the API. To save input tokens, the environment variable SKGC_COMPACT_TOKENS sets a number
+    of tokens above which the older turns of a request are replaced by a summary of gpt-4o-mini. The messages history
+    and thus the printed conversations stay complete. Not set by default, as the summary changes the context of the
+    later steps and the evaluation steps already leave out the parts of the conversation they don't need.
+
+    The reasoning steps (extraction of the literal and the semantic keywords, review of the final keyword list,
+    ordering of the keyword lists for the evaluation) use the model gpt-4o, the simpler steps (counting of the matching
+    keywords, correction of the output format) use the smaller model gpt-4o-mini. The models can be changed with the
+    environment variables SKGC_MODEL_HEAVY and SKGC_MODEL_LIGHT, e.g. SKGC_MODEL_LIGHT="gpt-4o" to use gpt-4o for all
+    steps. The matching keywords of the ordered lists of the evaluation are counted locally (count_matching_topics), the
+    environment variable SKGC_MATCH_COUNT="llm" lets the GPT agent count them as in the original evaluation.
+    With the environment variable OPENAI_BASE_URL, the requests are sent to another OpenAI-compatible server
+    instead, e.g. a local Ollama or vLLM server, which removes the network latency and the rate limits of the OpenAI
+    API. The embedding model of the semantic cache can be changed with SKGC_EMBEDDING_MODEL.
+
+    While the publications are processed, progress bars show the number of publications whose topics were extracted
+    and evaluated. The single steps of the conversations are only printed with the command line option --verbose.
+    The progress of the pipeline and the evaluation report are written with the logger "skgc". While the publications
+    are processed concurrently, the log records are written to the console by a background thread, so that the
+    concurrent conversations don't wait for the console output.
+
+    All calls to the GPT agent and the GPT assistant are made with temperature 0 and the fixed seed 4, so that re-runs
+    are deterministic apart from the non-determinism on the side of OpenAI. This keeps the evaluation metrics stable
+    and makes it safe to reuse cached responses: the responses of the OpenAI API are stored in the response cache
+    (skgc_cache.sqlite3, see llm_cache.py), so that re-running the pipeline on the same publications doesn't call the
+    API again. Additionally, the topics extracted
+    for a publication are reused for publications with a nearly identical title and abstract (cosine similarity of
+    the embeddings of at least 0.95, adjustable with the command line option --semantic-threshold). The cache can be
+    disabled with the command line option --no-cache.
+    The results and conversations of the evaluated publications are also written to the progress file
+    skgc_progress.jsonl one by one. If the run is interrupted, the next run takes these publications from the progress
+    file and only processes the others, also with --no-cache. The progress file is deleted after the results were
+    saved. With the command line option --no-resume, the progress of an interrupted run is discarded and all selected
+    publications are processed again.
+
+    For larger numbers of publications that don't need to be processed interactively, the command line option --batch
+    sends the requests to the Batch API of OpenAI, which is 50% cheaper and has separate, higher rate limits. All
+    publications are processed together and the requests are sent in waves (one batch per step of the pipeline), each
+    of which can take up to 24 hours. The format corrections of the GPT assistant are sent in the same waves, as a
+    separate batch with the API key of the assistant.
 
     Run the script and follow the prompts to input publication data, extract topics, and evaluate the results. The
     results can be printed to the console and saved to a file.
 
 Example:
     $ python SKGC.py
+    $ python SKGC.py --no-cache
+    $ python SKGC.py --no-resume
+    $ python SKGC.py --semantic-threshold 0.98
+    $ python SKGC.py --batch
+    $ python SKGC.py --publications-per-prompt 5
+    $ python SKGC.py --verbose
 """
 
 
+import argparse
+import asyncio
+import collections
+import difflib
+import functools
+import hashlib
+import io
+from itertools import zip_longest
 import json
-from typing import List, Dict, Any
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import random
+from typing import List, Dict, Any, Awaitable, Callable, Mapping, Optional, Set, Tuple
 import os
+import re
+import sqlite3
+import time
 from dotenv import load_dotenv
-from openai import OpenAI
+import httpx
+import numpy as np
+import tiktoken
+from openai import AsyncOpenAI, APIConnectionError, APIError, InternalServerError, RateLimitError
 import yaml
-from scipy.stats import hmean
+from llm_cache import UncachedResponse, cached, open_cache, close_cache, get_semantic_cache
+from tqdm.asyncio import tqdm_asyncio
 import sys
-import time
 
 
-class DualOutput:
+load_dotenv()  # loaded at import, so that the settings below can be made in the .env file as well
+
+MAX_CONCURRENCY = int(os.getenv("SKGC_MAX_CONCURRENCY", "8"))  # maximum number of publications that are processed
+# concurrently. Each publication is processed in one conversation with the GPT agent whose calls depend on each other
+# and are therefore sequential, but the conversations about different publications are independent of each other.
+
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)  # connection pool of the HTTP client
+HTTP_TIMEOUT = 60.0  # seconds
+
+MODEL_HEAVY = os.getenv("SKGC_MODEL_HEAVY", "gpt-4o")  # model for the reasoning steps: extraction of the literal
+# and the semantic keywords, review of the final keyword list (it produces the evaluated topics, so it stays on this
+# model until a comparison of the F1 values shows no loss with the smaller model), ordering of the keyword lists for
+# the evaluation. GPT-4o was chosen as the most recently
+# published model at the time of creating of this script (mid to end of May 2024). According to the announcement of
+# OpenAI, GPT-4o "achieves GPT-4 Turbo-level performance on text, reasoning, and coding intelligence", is faster and
+# cheaper in use than GPT-4 Turbo.
+MODEL_LIGHT = os.getenv("SKGC_MODEL_LIGHT", "gpt-4o-mini")  # smaller, faster and cheaper model for the steps that
+# don't need the reasoning capabilities of the larger model: counting of the matching keywords of the ordered lists and
+# correction of the output format by the GPT assistant
+BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # OpenAI-compatible server that is used instead of the OpenAI API,
+# e.g. a local Ollama (http://localhost:11434/v1) or vLLM (http://localhost:8000/v1) server with SKGC_MODEL_HEAVY and
+# SKGC_MODEL_LIGHT set to one of its models. Such servers don't need an API key or organization.
+
+RPM_LIMIT = int(os.getenv("SKGC_RPM_LIMIT", "0")) or None  # own limits of the requests and tokens per minute and
+TPM_LIMIT = int(os.getenv("SKGC_TPM_LIMIT", "0")) or None  # model, in addition to the limits of the organization that
+# are read from the rate limit headers. Not set by default.
+
+COMPACT_TOKENS = int(os.getenv("SKGC_COMPACT_TOKENS", "0")) or None  # number of tokens of a request to the GPT agent
+# above which the older turns of the conversation are replaced by a summary. Not set by default.
+COMPACT_SUMMARY_TOKENS = 300  # maximum number of tokens of the summary
+
+MATCH_COUNT = os.getenv("SKGC_MATCH_COUNT", "local")  # how the matching keywords of the ordered lists are counted:
+# "local" with count_matching_topics, "llm" with an additional call to the GPT agent per list (the method of the
+# original evaluation)
+FUZZY_MATCH_RATIO = 0.9  # minimum similarity (difflib) of two normalized keywords that differ in their spelling
+
+RETRY_ATTEMPTS = 8  # maximum number of attempts for a request that fails because of a transient error
+RETRY_MAX_WAIT = 60.0  # maximum waiting time in seconds between two attempts
+PUBLICATION_ERRORS = (APIError, httpx.TransportError, RuntimeError, ValueError, KeyError, IndexError)  # errors of the
+# requests about a publication (after the retries, or a failed batch of the Batch API) and of answers that can't be
+# parsed (PublicationParseError and json.JSONDecodeError are ValueErrors), which skip the publication instead of
+# stopping the run
+
+# Required output formats of the GPT agent's answers. Answers in these formats are used directly, only answers in
+# another format are sent to the GPT assistant that corrects the format.
+KEYWORD_WORD = r"[\w+#()./&'\-]+"  # a word of a keyword, including e.g. "C++", "C#", "(QA)", "TCP/IP" and "R&D"
+KEYWORD_FORMAT = rf"[ \t]*(?=[^,\n]*[^\W_]){KEYWORD_WORD}(?:[ \t]+{KEYWORD_WORD}){{0,9}}[ \t]*"  # up to 10 words with
+# at least one letter or digit, longer items are sentences rather than keywords
+COMMA_SEPARATED_LIST_FORMAT = re.compile(  # no introduction (e.g. "Sure, here are the keywords" or "The keywords
+    # are ...") or conclusion
+    rf"(?!\s*(?:sure|here|certainly|of course|okay|ok|the (?:keywords?|topics?|final|list)|these|below|i)\b)"
+    rf"{KEYWORD_FORMAT}(?:,{KEYWORD_FORMAT})*(?<!\.)", re.IGNORECASE)
+ORDERED_LISTS_FORMAT = re.compile(r"Your result:[^\n]*\n\s*Human expert result:[^\n]*")
+CSOC_ORDERED_LISTS_FORMAT = re.compile(r"CSOC result:[^\n]*\n\s*Human expert result:[^\n]*")
+JSON_RESPONSE_FORMAT = {"type": "json_object"}  # JSON mode of the OpenAI API for the answers about several
+# publications at once
+MATCHING_TOPICS_RESPONSE_FORMAT = {  # structured output of the OpenAI API for the count of the matching keywords, the
+    # answer always has this format, so it doesn't need to be checked by the GPT assistant
+    "type": "json_schema",
+    "json_schema": {
+        "name": "matching_topics",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"matching_topics": {"type": "integer"}},
+            "required": ["matching_topics"],
+            "additionalProperties": False
+        }
+    }
+}
+
+SYSTEM_MESSAGE_AGENT = {"role": "system", "content": "Hello GPT, you are my very helpful and intelligent assistant"
+                                                    " for a difficult task today."}  # first message of each
+# conversation with the GPT agent
+
+REPORT_ROW_FORMAT = "{:<40} {:<40} {:<40} {:<40}"  # table format of the evaluation details with 4 columns of 40
+# characters length
+REPORT_DIVIDER = "-" * 160
+REPORT_TABLE_HEADER = (REPORT_ROW_FORMAT.format("SKGC Topics", "Gold Standard (Order 1)", "Gold Standard (Order 2)",
+                                                "CSOC Topics") + "\n" + REPORT_DIVIDER)  # built once for all tables
+
+CACHE_FILE_NAME = "skgc_cache.sqlite3"  # SQLite database of the response cache, stored next to the script
+PROGRESS_FILE_NAME = "skgc_progress.jsonl"  # results of the already evaluated publications of the current run, stored
+# next to the script and deleted after the results were saved
+EMBEDDING_MODEL = os.getenv("SKGC_EMBEDDING_MODEL", "text-embedding-3-small")  # embedding model for the semantic
+# cache of the topic extraction
+
+logger = logging.getLogger("skgc")  # logger for the progress of the pipeline and the evaluation report
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_console_handler = logging.StreamHandler(sys.stdout)  # writes only the message, like print
+logger.addHandler(_console_handler)
+
+_openai_clients: Dict[str, AsyncOpenAI] = dict()  # one client per API key, shared by all concurrent conversations
+_rate_limiters: Dict[str, "RateLimiter"] = dict()  # one rate limiter per model, as the limits apply per model
+_batch_dispatcher: Optional["BatchDispatcher"] = None  # set while the pipeline runs with the Batch API
+_semantic_cache_failed = False  # set after the first failed lookup or store, the semantic cache is then skipped for the
+# rest of the run (e.g. a server given by OPENAI_BASE_URL that doesn't provide the embedding model)
+_http_client: Optional[httpx.AsyncClient] = None  # one HTTP client shared by all OpenAI clients, so that the TCP and
+# TLS connections to the OpenAI API are kept alive and reused across all calls instead of being set up per call
+
+
+class PublicationParseError(ValueError):
+    """
+    An error for an answer of the GPT agent that can't be parsed, even after the GPT assistant corrected its format.
+    The evaluation of the publication can't be continued without the answer.
+    """
+
+
+class RateLimiter:
     """
-    A class to handle simultaneous output to both the console and a file.
+    A class to wait before a request to the OpenAI API only if the rate limits of the organization would be surpassed.
+    The remaining requests and tokens and the time until they are reset are read from the x-ratelimit-* headers of each
+    response (https://platform.openai.com/docs/guides/rate-limits/rate-limits-in-headers). Requests that are sent
+    before the response to the former request has arrived are subtracted from the remaining requests and tokens, so
+    that concurrently processed publications don't use the same headroom.
+    Additionally, own limits for the requests and tokens per minute can be set. They are enforced with a sliding window
+    over the requests of the last minute, whose tokens are corrected with the usage reported by the API. The own
+    limits also work with servers that don't send rate limit headers, and allow to use only a part of the limits of
+    the organization.
 
     Attributes:
-        file (TextIO): A file object to write the output to.
-        console (object): The original standard output (sys.stdout).
+        remaining_requests (Optional[int]): Remaining requests until the reset, None if unknown.
+        remaining_tokens (Optional[int]): Remaining tokens until the reset, None if unknown.
+        reset_requests_at (float): Time (time.monotonic) when the request limit is reset.
+        reset_tokens_at (float): Time (time.monotonic) when the token limit is reset.
+        requests_per_minute (Optional[int]): Own limit of the requests per minute, None if not set.
+        tokens_per_minute (Optional[int]): Own limit of the tokens per minute, None if not set.
+        window (Deque[List[float]]): Time (time.monotonic) and tokens of the requests of the last minute.
 
     Methods:
-        write(message: str):
-            Writes a message to both the console and the file.
+        wait(estimated_tokens: int) -> List[float]:
+            Waits until a request with the estimated number of tokens can be sent and reserves the request and tokens.
 
-        flush():
-            Flushes both the console and the file buffers.
+        update(headers: Mapping[str, str]):
+            Updates the remaining requests and tokens from the headers of a response.
+
+        record_usage(reservation: List[float], total_tokens: int):
+            Replaces the estimated tokens of a sent request with the tokens reported by the API.
     """
 
-    def __init__(self, file):
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
         """
-        Initializes the DualOutput class with a file object.
+        Initializes the RateLimiter class. As long as no response was received, the limits of the organization are
+        unknown and requests are sent without waiting for them.
 
         Args:
-            file (TextIO): A file object where the output will be written.
+            requests_per_minute (Optional[int]): Own limit of the requests per minute, None for no own limit.
+            tokens_per_minute (Optional[int]): Own limit of the tokens per minute, None for no own limit.
+        """
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.reset_requests_at = 0.0
+        self.reset_tokens_at = 0.0
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = collections.deque()
+
+    async def wait(self, estimated_tokens: int) -> List[float]:
         """
-        self.file = file
-        self.console = sys.stdout
+        Waits until a request with the estimated number of tokens can be sent and reserves the request and tokens.
+
+        Args:
+            estimated_tokens (int): The estimated number of tokens of the request.
 
-    def write(self, message):
+        Returns:
+            reservation (List[float]): Time and tokens of the request in the window of the last minute, to be corrected
+            with record_usage.
+        """
+        while True:
+            now = time.monotonic()
+            if self.remaining_requests is not None and self.remaining_requests < 1:
+                if now < self.reset_requests_at:
+                    await asyncio.sleep(self.reset_requests_at - now)
+                    continue
+                self.remaining_requests = None  # reset has passed, the new limit is known with the next response
+            if self.remaining_tokens is not None and self.remaining_tokens < estimated_tokens:
+                if now < self.reset_tokens_at:
+                    await asyncio.sleep(self.reset_tokens_at - now)
+                    continue
+                self.remaining_tokens = None
+            while self.window and self.window[0][0] <= now - 60:
+                self.window.popleft()  # requests older than one minute don't count anymore
+            if self.requests_per_minute is not None and len(self.window) >= self.requests_per_minute:
+                await asyncio.sleep(self.window[0][0] + 60 - now)
+                continue
+            if (self.tokens_per_minute is not None and self.window
+                    and sum(tokens for _, tokens in self.window) + estimated_tokens > self.tokens_per_minute):
+                await asyncio.sleep(self.window[0][0] + 60 - now)
+                continue
+            break
+        if self.remaining_requests is not None:
+            self.remaining_requests -= 1
+        if self.remaining_tokens is not None:
+            self.remaining_tokens -= estimated_tokens
+        reservation = [now, estimated_tokens]
+        self.window.append(reservation)
+        return reservation
+
+    def update(self, headers: Mapping[str, str]):
         """
-        Writes a message to both the console and the file.
+        Updates the remaining requests and tokens from the headers of a response.
 
         Args:
-            message (str): The message to write.
+            headers (Mapping[str, str]): The headers of the response.
+        """
+        now = time.monotonic()
+        if "x-ratelimit-remaining-requests" in headers:
+            self.remaining_requests = int(headers["x-ratelimit-remaining-requests"])
+            self.reset_requests_at = now + parse_duration(headers.get("x-ratelimit-reset-requests", "0s"))
+        if "x-ratelimit-remaining-tokens" in headers:
+            self.remaining_tokens = int(headers["x-ratelimit-remaining-tokens"])
+            self.reset_tokens_at = now + parse_duration(headers.get("x-ratelimit-reset-tokens", "0s"))
+
+    def record_usage(self, reservation: List[float], total_tokens: int):
         """
-        self.console.write(message)  # Write to console
-        self.file.write(message)  # Write to file
+        Replaces the estimated tokens of a sent request with the tokens reported by the API (prompt and completion
+        tokens), so that the own limit of the tokens per minute is enforced with the actual usage.
 
-    def flush(self):
+        Args:
+            reservation (List[float]): The reservation returned by wait for the request.
+            total_tokens (int): The total tokens of the request reported in the usage field of the response.
         """
-        Flushes both the console and the file buffers.
+        reservation[1] = total_tokens
+
+
+class BatchDispatcher:
+    """
+    A class to send the requests of all concurrently processed publications to the Batch API of OpenAI instead of
+    sending them one by one. The Batch API is 50% cheaper and has separate, higher rate limits, but the results can take
+    up to 24 hours.
+    The calls within the conversation about one publication depend on each other, so the requests are sent in waves:
+    As soon as every running conversation waits for the response to a request, the collected requests are sent as one
+    batch (per OpenAI client), and the conversations continue when the batch is completed. The number of batches
+    therefore depends on the number of steps of the pipeline, not on the number of publications.
+
+    Attributes:
+        poll_interval (float): Seconds between two status requests for a running batch.
+        active_conversations (int): Number of conversations that are currently running.
+        pending (List[Tuple[AsyncOpenAI, Dict[str, Any], asyncio.Future]]): Requests waiting to be sent in the next
+        batch.
+        sending (bool): Whether a batch is currently being processed.
+        request_count (int): Number of requests submitted so far, used for the custom IDs of the requests.
+        tasks (Set[asyncio.Task]): The running tasks that send batches.
+
+    Methods:
+        start_conversations(count: int):
+            Registers conversations that may submit requests.
+
+        end_conversation():
+            Unregisters a finished conversation.
+
+        submit(client: AsyncOpenAI, request: Dict[str, Any]) -> str:
+            Submits a request for the next batch and waits for its response.
+    """
+
+    def __init__(self, poll_interval: float = 30.0):
         """
-        self.console.flush()
-        self.file.flush()
+        Initializes the BatchDispatcher class.
+
+        Args:
+            poll_interval (float): Seconds between two status requests for a running batch.
+        """
+        self.poll_interval = poll_interval
+        self.active_conversations = 0
+        self.pending = list()
+        self.sending = False
+        self.request_count = 0
+        self.tasks: Set[asyncio.Task] = set()  # references to the running tasks, so they are not garbage collected
+
+    def start_conversations(self, count: int):
+        """
+        Registers conversations that may submit requests.
+
+        Args:
+            count (int): The number of conversations.
+        """
+        self.active_conversations += count
+
+    def end_conversation(self):
+        """
+        Unregisters a finished conversation. The remaining conversations might all be waiting for responses now.
+        """
+        self.active_conversations -= 1
+        self._send_if_all_waiting()
+
+    async def submit(self, client: AsyncOpenAI, request: Dict[str, Any]) -> str:
+        """
+        Submits a request for the next batch and waits for its response.
+
+        Args:
+            client (AsyncOpenAI): The OpenAI client to use (agent or assistant).
+            request (Dict[str, Any]): The body of the chat completions request.
+
+        Returns:
+            response (str): The response from the API.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((client, request, future))
+        self._send_if_all_waiting()
+        return await future
+
+    def _send_if_all_waiting(self):
+        """
+        Starts sending the pending requests as soon as all running conversations wait for a response.
+        """
+        if self.pending and not self.sending and len(self.pending) >= self.active_conversations:
+            self.sending = True
+            requests, self.pending = self.pending, list()
+            task = asyncio.create_task(self._send(requests))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _send(self, requests: List[Tuple[AsyncOpenAI, Dict[str, Any], asyncio.Future]]):
+        """
+        Sends the requests as one batch per OpenAI client and passes the responses to the waiting conversations.
+
+        Args:
+            requests (List[Tuple[AsyncOpenAI, Dict[str, Any], asyncio.Future]]): The requests to send.
+        """
+        requests_per_client = dict()
+        for client, request, future in requests:
+            self.request_count += 1
+            requests_per_client.setdefault(client, list()).append((f"request-{self.request_count}", request, future))
+        results = await asyncio.gather(*[self._run_batch(client, client_requests) for client, client_requests in
+                                         requests_per_client.items()], return_exceptions=True)
+        self.sending = False
+        for client_requests, result in zip(requests_per_client.values(), results):
+            for custom_id, _, future in client_requests:
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                elif custom_id in result:
+                    future.set_result(result[custom_id])
+                else:
+                    future.set_exception(RuntimeError(f"No response for request {custom_id} in the batch."))
+        self._send_if_all_waiting()
+
+    async def _run_batch(self, client: AsyncOpenAI, client_requests: List[Tuple[str, Dict[str, Any], asyncio.Future]]
+                         ) -> Dict[str, str]:
+        """
+        Uploads the requests as JSONL file, creates a batch, waits until it is finished and downloads the responses.
+
+        Args:
+            client (AsyncOpenAI): The OpenAI client to use.
+            client_requests (List[Tuple[str, Dict[str, Any], asyncio.Future]]): The custom IDs and bodies of the
+            requests.
+
+        Returns:
+            responses (Dict[str, str]): The responses of the successful requests by custom ID.
+        """
+        lines = [json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": request})
+                 for custom_id, request, _ in client_requests]
+        input_file = await client.files.create(file=("skgc_batch.jsonl", "\n".join(lines).encode()), purpose="batch")
+        batch = await client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions",
+                                            completion_window="24h")
+        logger.info(f"Sent batch {batch.id} with {len(lines)} requests to the OpenAI Batch API, waiting for the"
+                    f" results...")
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(self.poll_interval)
+            batch = await client.batches.retrieve(batch.id)
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch.id} finished with status {batch.status}.")
+        output = await client.files.content(batch.output_file_id)
+        responses = dict()
+        for line in output.text.splitlines():
+            result = json.loads(line)
+            if result.get("response") and result["response"]["status_code"] == 200:
+                choice = result["response"]["body"]["choices"][0]
+                content = choice["message"]["content"].strip()
+                if choice.get("finish_reason") != "stop":  # not stored in the response cache, as in
+                    # create_chat_completion
+                    content = UncachedResponse(content)
+                responses[result["custom_id"]] = content
+        return responses
 
 
 def user_selection_file_or_text() -> str:
@@ -235,27 +723,15 @@ def read_publication_from_file() -> List[Dict[str, any]]:
         try:
             with open(file_name, 'r') as file:
                 data = json.load(file)
-                publications = []
-                for key, value in data.items():
-                    if "title" in value:
-                        title = value["title"]
-                    if "keywords" in value:
-                        keywords = value["keywords"]
-                    if "abstract" in value:
-                        abstract = value["abstract"]
-                    if "cso_output" in value and "final" in value["cso_output"]:
-                        csoc_result = value["cso_output"]["final"]
-                    if "gold_standard" in value and "majority_vote" in value["gold_standard"]:
-                        gold_standard = value["gold_standard"]["majority_vote"]
-
-                    publication = {
-                        "title": title.strip(),
-                        "keywords": keywords,
-                        "abstract": abstract.strip(),
-                        "csoc_result": csoc_result,
-                        "gold_standard": gold_standard
-                    }
-                    publications.append(publication)
+                # each publication is built from its own record only, missing elements get empty defaults instead
+                # of the values of the previous record
+                publications = [{
+                    "title": value.get("title", "").strip(),
+                    "keywords": value.get("keywords", []),
+                    "abstract": value.get("abstract", "").strip(),
+                    "csoc_result": value.get("cso_output", {}).get("final", []),
+                    "gold_standard": value.get("gold_standard", {}).get("majority_vote", [])
+                } for value in data.values()]
                 return publications
         except FileNotFoundError:
             print(f"File {file_name} not found. Make sure that the JSON file is located in the same folder like the"
@@ -341,15 +817,40 @@ def list_to_comma_separated_string(in_list: List) -> str:
     return string
 
 
-def extract_topics_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]]) -> List[str]:
+def normalize_topic_lists(topic_lists: List[List[str]]) -> List[List[str]]:
+    """
+    Strips the topics of several topic lists (e.g. the gold standards of all publications) in one pass. The lists are
+    concatenated into one list of topics with the offsets of the single lists, the topics are stripped with one map
+    call and the single lists are sliced out again.
+
+    Args:
+        topic_lists (List[List[str]]): The topic lists.
+
+    Returns:
+        List[List[str]]: The topic lists with stripped topics, in the same order.
+    """
+    all_topics = list()
+    offsets = [0]
+    for topics in topic_lists:
+        all_topics.extend(topics)
+        offsets.append(len(all_topics))
+    all_topics = list(map(str.strip, all_topics))
+    return [all_topics[start:end] for start, end in zip(offsets, offsets[1:])]
+
+
+async def extract_topics_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]]) -> List[str]:
     """
         Extracts the topics of a given publication based on the data about the publication (title, keywords and
         abstract). This is done via three calls to the GPT agent that performs the extraction task in three steps:
         1. syntactic component: literal keywords
         2. semantic component: additional relevant keywords
         3. review and confirmation
-        After each call to the GPT agent, there is a call to the GPT assistant that is only used to check the
-        correctness of the output format of the GPT agent's answers.
+        After each call to the GPT agent, the output format of the GPT agent's answer is checked. Only if it is not
+        correct, the GPT assistant is called to correct the output format.
+        If the semantic cache is used and contains a publication with a nearly identical title and abstract, the
+        topics and the conversation of that publication are reused instead. As the semantic cache is only an
+        optimization, a failed lookup or store (e.g. of the embedding) doesn't fail the publication, the semantic cache
+        is skipped for the rest of the run instead (see skip_semantic_cache).
 
         Args:
             publication (Dict[str, Any]): Publication of which the topics should be extracted.
@@ -362,90 +863,324 @@ def extract_topics_one(publication: Dict[str, Any], messages_history: List[Dict[
         Returns:
             topics (List[str]): List of extracted topics for the given publication
         """
-    prompts_gpt_agent = load_prompts_from_yaml("prompts_gpt_agent.yaml")
-    prompts_gpt_assistant = load_prompts_from_yaml("prompts_gpt_assistant.yaml")
+    # Semantic cache: publications with (nearly) the same title and abstract as a formerly processed publication get
+    # the topics of that publication without calling the GPT agent and GPT assistant again
+    semantic_cache = None if _semantic_cache_failed else get_semantic_cache()
+    embedding = None  # only computed if the semantic cache has no entry with exactly the same title and abstract
+    cached_result = None
+    if semantic_cache is not None:
+        publication_text = publication["title"] + "\n" + publication["abstract"]
+        semantic_key = semantic_cache.make_key(publication_text, SEMANTIC_CACHE_EXTRACTION)
+        try:
+            cached_result = semantic_cache.get_exact(semantic_key)
+            if cached_result is None:
+                embedding = await create_embedding(get_openai_client("API_KEY_AGENT"), publication_text)
+                cached_result = semantic_cache.get_similar(embedding, EMBEDDING_MODEL, SEMANTIC_CACHE_EXTRACTION)
+        except (APIError, httpx.TransportError, sqlite3.Error, ValueError) as e:  # ValueError: e.g. an embedding
+            # of an unexpected shape
+            skip_semantic_cache(e)
+        if cached_result is not None:
+            logger.debug("Topics of the publication were found in the semantic cache.")
+            topics, cached_messages_history = cached_result
+            messages_history.extend(cached_messages_history)  # the evaluation continues the conversation
+            return topics
+
     # messages format according to the OpenAI API reference: https://platform.openai.com/docs/api-reference/
-    messages_history.append({"role": "system", "content": "Hello GPT, you are my very helpful and intelligent assistant"
-                                                          " for a difficult task today."})
+    messages_history.append(SYSTEM_MESSAGE_AGENT)
 
     # 1st call to GPT agent API: Using prompt 1
-    prompt1 = prompts_gpt_agent[0].replace("XXXtitleXXX", publication["title"])  # use of templates and placeholders
-    prompt1 = prompt1.replace("XXXkeywordsXXX", list_to_comma_separated_string(publication["keywords"]))
-    prompt1 = prompt1.replace("XXXabstractXXX", publication["abstract"])
-    print("Sending prompt 1 to gpt agent...")  # In the terminal the user can see the progress of the extraction
+    prompt1 = PROMPTS_GPT_AGENT[0].format_map({  # use of templates and placeholders
+        "title": publication["title"],
+        "keywords": list_to_comma_separated_string(publication["keywords"]),
+        "abstract": publication["abstract"]
+    })
+    logger.debug("Sending prompt 1 to gpt agent...")  # In the terminal the user can see the progress of the extraction
     # and evaluation process
-    response1 = query_gpt_agent(prompt1, messages_history)
-    print("Received response 1 by gpt agent.")
-
-    # 1st call to GPT assistant API: Using prompt 1a
-    prompt1a = prompts_gpt_assistant[0].replace("XXXagent1XXX", response1)  # "XXXagent1XXX" is the placeholder
-    # for the GPT agent response that will be checked by the assistant
-    print("Sending prompt 1a to gpt assistant...")
-    response1 = query_gpt_assistant(prompt1a)
-    print("Received response 1a by gpt assistant.")
+    response1 = await query_gpt_agent(prompt1, messages_history, model=MODEL_HEAVY, max_tokens=800)
+    logger.debug("Received response 1 by gpt agent.")
+
+    # 1st check of the output format: Using prompt 1a for the GPT assistant if needed
+    response1 = await check_response_format(response1, COMMA_SEPARATED_LIST_FORMAT, PROMPTS_GPT_ASSISTANT[0], "agent1")
     messages_history.append({"role": "assistant", "content": response1})  # the messages history records all the
-    # of the conversation about one publication. Instead of storing the direct responses of the GPT agent, the checked
-    # responses of the GPT assistant are stored.
+    # of the conversation about one publication. Instead of storing the direct responses of the GPT agent, the
+    # responses with checked format are stored.
 
     # 2nd call to GPT agent API: Using prompt 2
-    prompt2 = prompts_gpt_agent[1].replace("XXXresponse1XXX", response1)
-    print("Sending prompt 2 to gpt agent...")
-    response2 = query_gpt_agent(prompt2, messages_history)
-    print("Received response 2 by gpt agent.")
-
-    # 2nd call to GPT assistant API: Using prompt 2a
-    prompt2a = prompts_gpt_assistant[1].replace("XXXagent2XXX", response2)
-    print("Sending prompt 2a to gpt assistant...")
-    response2 = query_gpt_assistant(prompt2a)
-    print("Received response 2a by gpt assistant.")
+    prompt2 = PROMPTS_GPT_AGENT[1].format_map({"response1": response1})
+    logger.debug("Sending prompt 2 to gpt agent...")
+    response2 = await query_gpt_agent(prompt2, messages_history, model=MODEL_HEAVY, max_tokens=800)
+    logger.debug("Received response 2 by gpt agent.")
+
+    # 2nd check of the output format: Using prompt 2a for the GPT assistant if needed
+    response2 = await check_response_format(response2, COMMA_SEPARATED_LIST_FORMAT, PROMPTS_GPT_ASSISTANT[1], "agent2")
     messages_history.append({"role": "assistant", "content": response2})
 
     # 3rd call to GPT agent API: Using prompt 3
-    prompt3 = prompts_gpt_agent[2].replace("XXXresponse2XXX", response2)
-    print("Sending prompt 3 to gpt agent...")
-    response3 = query_gpt_agent(prompt3, messages_history)
-    print("Received response 3 by gpt agent.")
-
-    # 3rd call to GPT assistant API: Using prompt 3a
-    prompt3a = prompts_gpt_assistant[2].replace("XXXagent3XXX", response3)
-    print("Sending prompt 3a to gpt assistant...")
-    response3 = query_gpt_assistant(prompt3a)
-    print("Received response 3a by gpt assistant.")
+    prompt3 = PROMPTS_GPT_AGENT[2].format_map({"response2": response2})
+    logger.debug("Sending prompt 3 to gpt agent...")
+    response3 = await query_gpt_agent(prompt3, messages_history, model=MODEL_HEAVY, max_tokens=400)
+    logger.debug("Received response 3 by gpt agent.")
+
+    # 3rd check of the output format: Using prompt 3a for the GPT assistant if needed
+    response3 = await check_response_format(response3, COMMA_SEPARATED_LIST_FORMAT, PROMPTS_GPT_ASSISTANT[2], "agent3")
     messages_history.append({"role": "assistant", "content": response3})
     skgc_topics = response3.split(',')
-    topics = [topic.strip() for topic in skgc_topics]
+    topics = list(map(str.strip, skgc_topics))
+    if embedding is not None and not _semantic_cache_failed and response3:  # failed extractions are not cached
+        try:
+            semantic_cache.set(semantic_key, embedding, EMBEDDING_MODEL, SEMANTIC_CACHE_EXTRACTION, topics,
+                               messages_history)
+        except (sqlite3.Error, ValueError) as e:
+            skip_semantic_cache(e)
     return topics
 
 
-def response_to_integer(response: str) -> int:
+def skip_semantic_cache(error: Exception):
+    """
+    Skips the semantic cache for the rest of the run after a failed lookup or store, so that the topics are extracted
+    without it and the failing request (e.g. the embedding) isn't repeated for every publication.
+
+    Args:
+        error (Exception): The error of the failed lookup or store.
+    """
+    global _semantic_cache_failed
+    if not _semantic_cache_failed:  # concurrently failing publications print the warning only once
+        logger.warning(f"Warning: The semantic cache couldn't be used ({error}). The topics are extracted without it"
+                       f" for the rest of the run.")
+    _semantic_cache_failed = True
+
+
+async def extract_topics_batch(publications: List[Dict[str, Any]], messages_history: List[Dict[str, str]]
+                               ) -> List[Optional[List[str]]]:
+    """
+    Extracts the topics of several publications in one conversation with the GPT agent. The three steps are the same
+    as in extract_topics_one, but each prompt covers all given publications, and the GPT agent answers with a JSON
+    object that maps the number of each publication to its comma-separated keyword list. Thus, the number of calls and
+    the tokens of the instructions and examples are shared by all publications.
+
+    Args:
+        publications (List[Dict[str, Any]]): Publications of which the topics should be extracted.
+        messages_history (List[Dict[str, str]]): GPT agent messages history regarding the topic extraction of the given
+        publications.
+
+    Returns:
+        List[Optional[List[str]]]: The extracted topics of each publication, in the order of the publications. None
+        for publications whose keyword list is missing or not in the correct format in the final answer.
+    """
+    messages_history.append(SYSTEM_MESSAGE_AGENT)
+    publications_text = "\n".join(
+        f'Research paper {number}:\n"""\nTitle: {publication["title"]}\n'
+        f'Author keywords: {list_to_comma_separated_string(publication["keywords"])}\n'
+        f'Abstract: {publication["abstract"]}\n"""'
+        for number, publication in enumerate(publications, start=1))
+    max_tokens = min(800 * len(publications), 16000)  # the answers contain the keyword lists of all publications
+
+    # 1st call to GPT agent API: literal keywords of all publications
+    prompt1 = PROMPTS_GPT_AGENT_BATCH[0].format_map({"publications": publications_text})
+    logger.debug(f"Sending prompt 1 for {len(publications)} publications to gpt agent...")
+    response1 = await query_gpt_agent(prompt1, messages_history, model=MODEL_HEAVY, max_tokens=max_tokens,
+                                      response_format=JSON_RESPONSE_FORMAT)
+    logger.debug("Received response 1 by gpt agent.")
+    messages_history.append({"role": "assistant", "content": response1})
+
+    # 2nd call to GPT agent API: additional relevant keywords of all publications
+    prompt2 = PROMPTS_GPT_AGENT_BATCH[1].format_map({"response1": response1})
+    logger.debug(f"Sending prompt 2 for {len(publications)} publications to gpt agent...")
+    response2 = await query_gpt_agent(prompt2, messages_history, model=MODEL_HEAVY, max_tokens=max_tokens,
+                                      response_format=JSON_RESPONSE_FORMAT)
+    logger.debug("Received response 2 by gpt agent.")
+    messages_history.append({"role": "assistant", "content": response2})
+
+    # 3rd call to GPT agent API: review of the keyword lists of all publications
+    prompt3 = PROMPTS_GPT_AGENT_BATCH[2].format_map({"response2": response2})
+    logger.debug(f"Sending prompt 3 for {len(publications)} publications to gpt agent...")
+    response3 = await query_gpt_agent(prompt3, messages_history, model=MODEL_HEAVY, max_tokens=max_tokens,
+                                      response_format=JSON_RESPONSE_FORMAT)
+    logger.debug("Received response 3 by gpt agent.")
+    messages_history.append({"role": "assistant", "content": response3})
+    return parse_topics_batch(response3, len(publications))
+
+
+def parse_topics_batch(response: str, num_publications: int) -> List[Optional[List[str]]]:
+    """
+    Parses the JSON answer of the GPT agent about several publications.
+
+    Args:
+        response (str): The answer of the GPT agent, a JSON object that maps the number of each publication (starting
+        with 1) to its comma-separated keyword list.
+        num_publications (int): The number of publications.
+
+    Returns:
+        List[Optional[List[str]]]: The topics of each publication, None for publications whose keyword list is missing
+        or not in the correct format.
+    """
+    try:
+        answer = json.loads(response)
+    except json.JSONDecodeError:
+        answer = dict()
+    if not isinstance(answer, dict):
+        answer = dict()
+    topics = list()
+    for number in range(1, num_publications + 1):
+        keywords = answer.get(str(number))
+        if isinstance(keywords, str) and COMMA_SEPARATED_LIST_FORMAT.fullmatch(keywords):
+            topics.append(list(map(str.strip, keywords.split(','))))
+        else:
+            topics.append(None)
+    return topics
+
+
+async def check_response_format(response: str, response_format: re.Pattern, prompt_template: str,
+                                placeholder: str) -> str:
+    """
+    Checks the output format of a GPT agent's answer. If the answer matches the required format, it is returned
+    directly. Only otherwise, the GPT assistant is asked to correct the format of the answer.
+
+    Args:
+        response (str): The answer of the GPT agent.
+        response_format (re.Pattern): The required output format.
+        prompt_template (str): The template of the prompt to the GPT assistant.
+        placeholder (str): The placeholder for the answer of the GPT agent in the prompt template.
+
+    Returns:
+        response (str): The answer in the required output format.
+    """
+    if response_format.fullmatch(response):
+        return response
+    logger.debug(f"Format of the response ({placeholder}) is not correct. Sending it to gpt assistant...")
+    response = await query_gpt_assistant(prompt_template.format_map({placeholder: response}))
+    logger.debug(f"Received the response ({placeholder}) in the corrected format by gpt assistant.")
+    if not response_format.fullmatch(response):  # the answer is still used, answers that can't be parsed at all
+        # raise a PublicationParseError where they are parsed
+        logger.warning(f"Warning: The corrected response ({placeholder}) is still not in the required format.")
+    return response
+
+
+def split_ordered_lists(response: str, label: str) -> Tuple[List[str], List[str]]:
+    """
+    Splits the answer of the GPT agent with the two ordered keyword lists of the evaluation ("Your result" or
+    "CSOC result", and "Human expert result") into the two lists.
+
+    Args:
+        response (str): The answer of the GPT agent in the format ORDERED_LISTS_FORMAT or CSOC_ORDERED_LISTS_FORMAT.
+        label (str): The label of the first list, "Your result" or "CSOC result".
+
+    Returns:
+        Tuple[List[str], List[str]]: The ordered keywords of the first list and of the human expert result.
+
+    Raises:
+        PublicationParseError: If the answer doesn't contain both lists.
+    """
+    if f"{label}:" not in response or "Human expert result:" not in response:
+        raise PublicationParseError(f"The ordered lists of the evaluation are missing in the answer: {response!r}")
+    result = response.split(f"{label}:")[1].split("Human expert result:")[0].strip()
+    human_expert_result = response.split("Human expert result:")[1].strip()
+    return list(map(str.strip, result.split(","))), list(map(str.strip, human_expert_result.split(",")))
+
+
+def parse_matching_topics(response: str) -> int:
     """
-    Converts a string to an integer.
-    If the string doesn't contain integer (or additional content), 0 is returned.
+    Reads the count of the matching keywords from the structured answer of the GPT agent
+    (MATCHING_TOPICS_RESPONSE_FORMAT).
+    If the answer isn't in this format (e.g. the request failed), 0 is returned.
 
     Args:
-    response (str): The response to be converted to an integer.
+    response (str): The answer of the GPT agent, e.g. {"matching_topics": 11}.
 
     Returns:
-    int: The converted integer if successful, or 0 if an error occurred.
+    int: The count of the matching keywords if successful, or 0 if an error occurred.
     """
     try:
-        count = int(response)
-        return count
-    except ValueError:
-        print("Error: The Evaluation procedure was partly not successful."
-              "The evaluation count did not work as expected.")
+        return int(json.loads(response)["matching_topics"])
+    except (ValueError, TypeError, KeyError):  # json.JSONDecodeError is a ValueError
+        logger.error("Error: The Evaluation procedure was partly not successful."
+                     "The evaluation count did not work as expected.")
         return 0
 
 
-def eval_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]]):
+def normalize_keyword(keyword: str) -> str:
+    """
+    Normalizes a keyword for the count of the matching keywords: lower case, punctuation (except dots, e.g. in
+    "web 2.0") replaced by spaces, and the plural "s" of each word removed.
+
+    Args:
+        keyword (str): The keyword.
+
+    Returns:
+        str: The normalized keyword.
+    """
+    words = re.sub(r"[^\w.]+", " ", keyword.lower()).split()
+    return " ".join(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+                    for word in words)
+
+
+def keywords_match(keyword1: str, keyword2: str) -> bool:
+    """
+    Checks if two normalized keywords are similar according to the examples of the evaluation prompts: keywords that
+    differ only in being singular and plural (already equal after the normalization), keywords of which one starts with
+    the other if the shorter one has at least two words (e.g. "semantic web" and "semantic web service"), and keywords
+    that differ only slightly in their spelling. A single word isn't similar to every keyword that starts with it
+    (e.g. "data" and "data mining"), so the count is stricter than the example "semantics" and "semantic desktop" of
+    the evaluation prompts.
+
+    Args:
+        keyword1 (str): The first normalized keyword.
+        keyword2 (str): The second normalized keyword.
+
+    Returns:
+        bool: True if the keywords are similar.
+    """
+    if keyword1 == keyword2:
+        return True
+    words1, words2 = keyword1.split(), keyword2.split()
+    common_length = min(len(words1), len(words2))
+    if common_length >= 2 and words1[:common_length] == words2[:common_length]:
+        return True
+    return difflib.SequenceMatcher(None, keyword1, keyword2).ratio() >= FUZZY_MATCH_RATIO
+
+
+def count_matching_topics(topics: List[str], gold_standard: List[str]) -> int:
+    """
+    Counts the matching and similar keywords of a keyword list and the gold standard without a call to the GPT agent.
+    Each keyword of the gold standard is matched with at most one keyword of the other list. First, the keywords that
+    are equal after the normalization are matched (set intersection), then the remaining keywords are matched with the
+    first similar remaining keyword of the gold standard. Empty keywords (e.g. of an empty CSOC result or a trailing
+    comma) are left out.
+
+    Args:
+        topics (List[str]): The keywords of the SKGC or CSOC result.
+        gold_standard (List[str]): The keywords of the gold standard.
+
+    Returns:
+        int: The number of matching and similar keywords.
+    """
+    unmatched_gold_standard = collections.Counter(filter(None, map(normalize_keyword, gold_standard)))
+    unmatched_topics = collections.Counter(filter(None, map(normalize_keyword, topics)))
+    exact_matches = unmatched_topics & unmatched_gold_standard
+    unmatched_topics -= exact_matches
+    unmatched_gold_standard -= exact_matches
+    count = sum(exact_matches.values())
+    remaining_gold_standard = list(unmatched_gold_standard.elements())
+    for topic in unmatched_topics.elements():
+        for index, gold_standard_topic in enumerate(remaining_gold_standard):
+            if keywords_match(topic, gold_standard_topic):
+                del remaining_gold_standard[index]
+                count += 1
+                break
+    return count
+
+
+async def eval_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]], context_start: int = 1):
     """
             Evaluates the topic extraction result for the given publication and compares it to the result of the State
             Of the Art (SOTA) for topic extraction in the field of computer science, the Computer Science Ontology
             Classifier (CSOC): https://github.com/angelosalatino/cso-classifier
             The evaluation is done via four calls to the GPT agent API. The first two calls refer to the evaluation of
             the SKGC (this program) result, the last two calls refer to the evaluation of the CSOC result that was read
-            in from the JSON file or the user input. For each SKGC and CSOC the metrics precision, recall and F1 for
-            their evaluation with the provided gold standard (human expert annotation) are calculated.
+            in from the JSON file or the user input. The last two calls are made by eval_csoc_one in a separate
+            conversation, as they don't depend on the topic extraction. For each SKGC and CSOC the metrics precision,
+            recall and F1 for their evaluation with the provided gold standard (human expert annotation) are
+            calculated.
             The four calls to the GPT agent refer to the following tasks:
 
             1. Comparison between the SKGC result and the gold standard via ordering the keyword lists according to the
@@ -460,207 +1195,486 @@ def eval_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]]
             similar keywords. Keywords that cannot be matched are put at the end of each list.
             4. Count of the matching and similar keywords of the two lists CSOC result and gold standard.
 
-            After each call to the GPT agent, there is a call to the GPT assistant that is only used to check the
-            correctness of the output format of the GPT agent's answers.
-            The final evaluation results (csoc_topics_ordered, gold_standard_ordered1, gold_standard_ordered2,
-            skgc_topics_ordered, skgc_precision, skgc_recall, skgc_F1, csoc_precision, csoc_recall, csoc_F1) are stored
-            in the publication dictionary.
+            By default (SKGC_MATCH_COUNT="local"), the counts of step 2 and 4 are computed locally with
+            count_matching_topics instead of calling the GPT agent, which saves two calls per publication and makes the
+            metrics independent of the non-determinism of the GPT agent. With SKGC_MATCH_COUNT="llm", the GPT agent
+            counts the keywords as in the original evaluation, answering with structured output
+            (MATCHING_TOPICS_RESPONSE_FORMAT). The count prompts contain the ordered lists and their own examples, so
+            they are sent only with the system message instead of the whole conversation.
+
+            After each call to the GPT agent for the ordered lists, the output format of the GPT agent's answer is
+            checked. Only if it is not correct, the GPT assistant is called to correct the output format.
+            The final evaluation results of the SKGC result (gold_standard_ordered1, skgc_topics_ordered,
+            skgc_precision, skgc_recall, skgc_F1) are stored in the publication dictionary.
 
             Args:
-                publication (Dict[str, Any]): Publication of which the SKGC and CSOC results should be evaluated.
+                publication (Dict[str, Any]): Publication of which the SKGC result should be evaluated.
                 messages_history (List[Dict[str, str]]): GPT agent messages history regarding the topic extraction of
             the current publication. The messages history contains only the messages with the GPT agent, not with
             the GPT assistant that is only used to check the correctness of the output format of the GPT agent's
             answers. The Open AI API currently doesn't store the history itself
             ( https://platform.openai.com/docs/guides/text-generation/chat-completions-api).
+                context_start (int): Index of the first message after the system message that is sent to the API for
+            the evaluation of the SKGC result, e.g. to leave out a topic extraction about several publications.
             Returns:
                 None
             """
 
-    prompts_gpt_agent_eval = load_prompts_from_yaml("prompts_gpt_agent_eval.yaml")
-    prompts_gpt_assistant_eval = load_prompts_from_yaml("prompts_gpt_assistant_eval.yaml")
+    skgc_topics_string = list_to_comma_separated_string(publication["skgc_topics"])
+    gold_standard_string = list_to_comma_separated_string(publication["gold_standard"])
 
     # 1st call to GPT agent API: Using prompt 1
-    prompt1 = prompts_gpt_agent_eval[0].replace("XXXskgc_topicsXXX", list_to_comma_separated_string
-                                                (publication["skgc_topics"]))   # use of templates and placeholders
-    prompt1 = prompt1.replace("XXXgold_standardXXX", list_to_comma_separated_string(publication["gold_standard"]))
-    print("Sending prompt 1 to gpt agent...")  # In the terminal the user can see the progress of the extraction
+    prompt1 = PROMPTS_GPT_AGENT_EVAL[0].format_map({  # use of templates and placeholders
+        "skgc_topics": skgc_topics_string,
+        "gold_standard": gold_standard_string
+    })
+    logger.debug("Sending prompt 1 to gpt agent...")  # In the terminal the user can see the progress of the extraction
     # and evaluation process
-    response1 = query_gpt_agent(prompt1, messages_history)
-    print("Received response 1 by gpt agent.")
-
-    # 1st call to GPT assistant API: Using prompt 1a
-    prompt1a = prompts_gpt_assistant_eval[0].replace("XXXagent4XXX", response1)  # "XXXagent4XXX" is the placeholder
-    # for the GPT agent response that will be checked by the assistant
-    print("Sending prompt 1a to gpt assistant...")
-    response1 = query_gpt_assistant(prompt1a)
-    print("Received response 1a by gpt assistant.")
-    your_result = response1.split('Your result:')[1].split('Human expert result:')[0].strip()
-    skgc_topics_ordered = your_result.split(',')
-    human_expert_result = response1.split('Human expert result:')[1].strip()
-    gold_standard_ordered1 = human_expert_result.split(',')  # gold standard is ordered twice: First in comparison with
-    # the SKGC result (gold_standard_ordered1) and second in comparison with the CSOC result (gold_standard_ordered2)
-    publication["skgc_topics_ordered"] = [topic.strip() for topic in skgc_topics_ordered]
-    publication["gold_standard_ordered1"] = [topic.strip() for topic in gold_standard_ordered1]
+    response1 = await query_gpt_agent(prompt1, messages_history, model=MODEL_HEAVY, max_tokens=800,
+                                      context_start=context_start)
+    logger.debug("Received response 1 by gpt agent.")
+
+    # 1st check of the output format: Using prompt 1a for the GPT assistant if needed
+    response1 = await check_response_format(response1, ORDERED_LISTS_FORMAT, PROMPTS_GPT_ASSISTANT_EVAL[0], "agent4")
+    skgc_topics_ordered, gold_standard_ordered1 = split_ordered_lists(response1, "Your result")  # gold standard is
+    # ordered twice: First in comparison with the SKGC result (gold_standard_ordered1) and second in comparison with
+    # the CSOC result (gold_standard_ordered2)
+    publication["skgc_topics_ordered"] = skgc_topics_ordered
+    publication["gold_standard_ordered1"] = gold_standard_ordered1
     messages_history.append({"role": "assistant", "content": response1})  # the messages history records all the
-    # of the conversation about one publication. Instead of storing the direct responses of the GPT agent, the checked
-    # responses of the GPT assistant are stored.
-
-    # 2nd call to GPT agent API: Using prompt 2
-    prompt2 = prompts_gpt_agent_eval[1].replace("XXXskgc_topics_orderedXXX", list_to_comma_separated_string
-                                                (skgc_topics_ordered))
-    prompt2 = prompt2.replace("XXXgold_standard_orderedXXX", list_to_comma_separated_string
-                              (gold_standard_ordered1))
-    print("Sending prompt 2 to gpt agent...")
-    response2 = query_gpt_agent(prompt2, messages_history)
-    print("Received response 2 by gpt agent.")
-
-    # 2nd call to GPT assistant API: Using prompt 2a
-    prompt2a = prompts_gpt_assistant_eval[1].replace("XXXagent5XXX", response2)
-    print("Sending prompt 2a to gpt assistant...")
-    response2 = query_gpt_assistant(prompt2a)
-    print("Received response 2a by gpt assistant.")
-    matching_topics = response_to_integer(response2)
+    # of the conversation about one publication. Instead of storing the direct responses of the GPT agent, the
+    # responses with checked format are stored.
+
+    if MATCH_COUNT == "llm":
+        # 2nd call to GPT agent API: Using prompt 2
+        prompt2 = PROMPTS_GPT_AGENT_EVAL[1].format_map({
+            "skgc_topics_ordered": list_to_comma_separated_string(skgc_topics_ordered),
+            "gold_standard_ordered": list_to_comma_separated_string(gold_standard_ordered1)
+        })
+        logger.debug("Sending prompt 2 to gpt agent...")
+        response2 = await query_gpt_agent(prompt2, messages_history, model=MODEL_LIGHT, max_tokens=16,
+                                          context_start=len(messages_history),
+                                          response_format=MATCHING_TOPICS_RESPONSE_FORMAT)  # prompt 2 contains the
+        # ordered lists and its own examples, so it is sent without the earlier messages
+        logger.debug("Received response 2 by gpt agent.")
+        matching_topics = parse_matching_topics(response2)  # the format of the structured output doesn't need to
+        # be checked
+        messages_history.append({"role": "assistant", "content": response2})
+    else:
+        matching_topics = count_matching_topics(publication["skgc_topics_ordered"],
+                                                publication["gold_standard_ordered1"])
+        logger.debug(f"Matching keywords of the SKGC result and the gold standard: {matching_topics}")
     if len(skgc_topics_ordered) == 0:
         precision = -1
-        print("Error: Evaluation partly failed. Precision value of -1 means incorrect evaluation")
+        logger.error("Error: Evaluation partly failed. Precision value of -1 means incorrect evaluation")
     else:
         precision = float(matching_topics)/len(skgc_topics_ordered)
     if len(gold_standard_ordered1) == 0:
         recall = -1
-        print("Error: Evaluation partly failed. Recall value of -1 means incorrect evaluation")
+        logger.error("Error: Evaluation partly failed. Recall value of -1 means incorrect evaluation")
     else:
         recall = float(matching_topics)/len(gold_standard_ordered1)
-    if precision + recall == 0:
+    if precision < 0 or recall < 0:
         f1 = -1
-        print("Error: Evaluation partly failed. F1 value of -1 means incorrect evaluation")
+        logger.error("Error: Evaluation partly failed. F1 value of -1 means incorrect evaluation")
+    elif precision + recall == 0:
+        f1 = 0.0  # no matching keywords
     else:
-        f1 = hmean([precision, recall])
+        f1 = 2.0 * precision * recall / (precision + recall)  # harmonic mean of precision and recall
     publication["skgc_precision"] = precision
     publication["skgc_recall"] = recall
     publication["skgc_f1"] = f1
-    messages_history.append({"role": "assistant", "content": response2})
+
+
+async def eval_csoc_one(publication: Dict[str, Any], messages_history: List[Dict[str, str]]):
+    """
+    Evaluates the CSOC result of the given publication (steps 3 and 4 of the evaluation, see eval_one): the CSOC result
+    and the gold standard are ordered according to the similarity of their keywords, then the matching and similar
+    keywords are counted. The comparison is independent of the topic extraction and of the evaluation of the SKGC
+    result, and prompt 3 contains its own examples. Therefore, it is done in a separate conversation with the GPT agent
+    that starts with the system message only and runs concurrently with the topic extraction. The final evaluation
+    results (csoc_topics_ordered, gold_standard_ordered2, csoc_precision, csoc_recall, csoc_F1) are stored in the
+    publication dictionary.
+
+    Args:
+        publication (Dict[str, Any]): Publication of which the CSOC result should be evaluated.
+        messages_history (List[Dict[str, str]]): Empty list for the GPT agent messages history of the comparison. The
+        messages after the system message are appended to the conversation about the publication afterwards.
+
+    Returns:
+        None
+    """
+    messages_history.append(SYSTEM_MESSAGE_AGENT)
+    gold_standard_string = list_to_comma_separated_string(publication["gold_standard"])
+    csoc_topics_string = list_to_comma_separated_string(publication["csoc_result"])
 
     # 3rd call to GPT agent API: Using prompt 3
-    prompt3 = prompts_gpt_agent_eval[2].replace("XXXcsoc_topicsXXX", list_to_comma_separated_string
-                                                (publication["csoc_result"]))
-    prompt3 = prompt3.replace("XXXgold_standardXXX", list_to_comma_separated_string(publication["gold_standard"]))
-    print("Sending prompt 3 to gpt agent...")
-    response3 = query_gpt_agent(prompt3, messages_history)
-    print("Received response 3 by gpt agent.")
-
-    # 3rd call to GPT assistant API: Using prompt 3a
-    prompt3a = prompts_gpt_assistant_eval[2].replace("XXXagent6XXX", response3)
-    print("Sending prompt 3a to gpt assistant...")
-    response3 = query_gpt_assistant(prompt3a)
-    print("Received response 3a by gpt assistant.")
-    csoc_result = response3.split('CSOC result:')[1].split('Human expert result:')[0].strip()
-    csoc_topics_ordered = csoc_result.split(',')
-    human_expert_result = response3.split('Human expert result:')[1].strip()
-    gold_standard_ordered2 = human_expert_result.split(',')  # gold standard is ordered twice: First in comparison with
-    # the SKGC result (gold_standard_ordered1) and second in comparison with the CSOC result (gold_standard_ordered2)
-    publication["csoc_topics_ordered"] = [topic.strip() for topic in csoc_topics_ordered]
-    publication["gold_standard_ordered2"] = [topic.strip() for topic in gold_standard_ordered2]
+    prompt3 = PROMPTS_GPT_AGENT_EVAL[2].format_map({
+        "csoc_topics": csoc_topics_string,
+        "gold_standard": gold_standard_string
+    })
+    logger.debug("Sending prompt 3 to gpt agent...")
+    response3 = await query_gpt_agent(prompt3, messages_history, model=MODEL_HEAVY, max_tokens=800)
+    logger.debug("Received response 3 by gpt agent.")
+
+    # 3rd check of the output format: Using prompt 3a for the GPT assistant if needed
+    response3 = await check_response_format(response3, CSOC_ORDERED_LISTS_FORMAT, PROMPTS_GPT_ASSISTANT_EVAL[1],
+                                            "agent6")
+    csoc_topics_ordered, gold_standard_ordered2 = split_ordered_lists(response3, "CSOC result")  # gold standard is
+    # ordered twice: First in comparison with the SKGC result (gold_standard_ordered1) and second in comparison with
+    # the CSOC result (gold_standard_ordered2)
+    publication["csoc_topics_ordered"] = csoc_topics_ordered
+    publication["gold_standard_ordered2"] = gold_standard_ordered2
     messages_history.append({"role": "assistant", "content": response3})
 
-    # 4th call to GPT agent API: Using prompt 4
-    prompt4 = prompts_gpt_agent_eval[3].replace("XXXcsoc_topics_orderedXXX", list_to_comma_separated_string
-                                                (csoc_topics_ordered))
-    prompt4 = prompt4.replace("XXXgold_standard_orderedXXX", list_to_comma_separated_string
-                              (gold_standard_ordered2))
-    print("Sending prompt 4 to gpt agent...")
-    response4 = query_gpt_agent(prompt4, messages_history)
-    print("Received response 4 by gpt agent.")
-
-    # 4th call to GPT assistant API: Using prompt 4a
-    prompt4a = prompts_gpt_assistant_eval[3].replace("XXXagent7XXX", response4)
-    print("Sending prompt 4a to gpt assistant...")
-    response4 = query_gpt_assistant(prompt4a)
-    print("Received response 4a by gpt assistant.")
-    matching_topics = response_to_integer(response4)
+    if MATCH_COUNT == "llm":
+        # 4th call to GPT agent API: Using prompt 4
+        prompt4 = PROMPTS_GPT_AGENT_EVAL[3].format_map({
+            "csoc_topics_ordered": list_to_comma_separated_string(csoc_topics_ordered),
+            "gold_standard_ordered": list_to_comma_separated_string(gold_standard_ordered2)
+        })
+        logger.debug("Sending prompt 4 to gpt agent...")
+        response4 = await query_gpt_agent(prompt4, messages_history, model=MODEL_LIGHT, max_tokens=16,
+                                          context_start=len(messages_history),
+                                          response_format=MATCHING_TOPICS_RESPONSE_FORMAT)  # prompt 4 contains the
+        # ordered lists and its own examples, so it is sent without the earlier messages
+        logger.debug("Received response 4 by gpt agent.")
+        matching_topics = parse_matching_topics(response4)  # the format of the structured output doesn't need to
+        # be checked
+        messages_history.append({"role": "assistant", "content": response4})
+    else:
+        matching_topics = count_matching_topics(publication["csoc_topics_ordered"],
+                                                publication["gold_standard_ordered2"])
+        logger.debug(f"Matching keywords of the CSOC result and the gold standard: {matching_topics}")
     if len(csoc_topics_ordered) == 0:
         precision = -1
-        print("Error: Evaluation partly failed. Precision value of -1 means incorrect evaluation")
+        logger.error("Error: Evaluation partly failed. Precision value of -1 means incorrect evaluation")
     else:
         precision = float(matching_topics) / len(csoc_topics_ordered)
     if len(gold_standard_ordered2) == 0:
         recall = -1
-        print("Error: Evaluation partly failed. Recall value of -1 means incorrect evaluation")
+        logger.error("Error: Evaluation partly failed. Recall value of -1 means incorrect evaluation")
     else:
         recall = float(matching_topics) / len(gold_standard_ordered2)
-    if precision + recall == 0:
+    if precision < 0 or recall < 0:
         f1 = -1
-        print("Error: Evaluation partly failed. F1 value of -1 means incorrect evaluation")
+        logger.error("Error: Evaluation partly failed. F1 value of -1 means incorrect evaluation")
+    elif precision + recall == 0:
+        f1 = 0.0  # no matching keywords
     else:
-        f1 = hmean([precision, recall])
+        f1 = 2.0 * precision * recall / (precision + recall)  # harmonic mean of precision and recall
     publication["csoc_precision"] = precision
     publication["csoc_recall"] = recall
     publication["csoc_f1"] = f1
-    messages_history.append({"role": "assistant", "content": response4})
 
 
-def extract_topics_all(publications: List[Dict[str, Any]], messages_history_all: List[List[Dict[str, str]]]) -> List[
-                        Dict[str, Any]]:
+def progress_key(publication: Dict[str, Any]) -> str:
     """
-    Extract topics from publications and add them to the dictionary of each publication as "SKGC topics".
+    Returns the key of a publication in the progress file.
+
+    Args:
+        publication (Dict[str, Any]): The publication.
+
+    Returns:
+        str: The title and the abstract of the publication.
+    """
+    return f'{publication["title"]}\n{publication["abstract"]}'
+
+
+def load_progress(file_name: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Reads the publications that were already extracted and evaluated in an earlier, interrupted run from the progress
+    file. An incomplete last line (the run was interrupted while writing it) is removed from the progress file, so that
+    the results of the next run are appended after the last complete line.
+
+    Args:
+        file_name (str): The name of the progress file (JSON Lines).
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The results (publication and messages_history) of each publication, by progress key.
+        Empty if the progress file doesn't exist.
+    """
+    progress = dict()
+    complete_size = 0  # size of the complete lines in bytes
+    try:
+        with open(file_name, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                complete_size += len(line)
+                record = json.loads(line)
+                progress[progress_key(record["publication"])] = record
+        if complete_size < os.path.getsize(file_name):
+            os.truncate(file_name, complete_size)
+    except FileNotFoundError:
+        pass
+    return progress
+
+
+async def extract_topics_and_eval_all(publications: List[Dict[str, Any]],
+                                      messages_history_all: List[List[Dict[str, str]]],
+                                      publications_per_prompt: int = 1,
+                                      progress_file_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Extract topics from publications, add them to the dictionary of each publication as "SKGC topics" and evaluate
+    them against the gold standard and in comparison with the CSOC result.
+    The publications are processed concurrently (at most MAX_CONCURRENCY publications at the same time, all
+    publications when the Batch API is used), the calls to the GPT agent and GPT assistant within the conversation about
+    one publication stay sequential. The evaluation of a publication directly follows its topic extraction, so that
+    the evaluation of the first publications overlaps with the topic extraction of the later publications instead of
+    waiting for the topic extraction of all publications. The evaluation of the CSOC result doesn't depend on the topic
+    extraction, so it runs concurrently with the topic extraction in a separate conversation (see eval_csoc_one), which
+    is appended to the conversation about the publication afterwards.
+    With more than one publication per prompt, the topics of groups of publications are extracted first, each group in
+    one conversation (see extract_topics_batch). Publications whose topics are missing in the answer about their group
+    are extracted on their own afterwards. The evaluation stays the same for each publication.
+    The result and the conversation of each publication are appended to the progress file as soon as the publication
+    is evaluated. Publications that are already in the progress file (from an interrupted run) are taken from there
+    instead of being processed again. A publication whose requests fail after all retries or whose answers can't be
+    parsed (PUBLICATION_ERRORS) is skipped and left out of the results, the other publications are processed as usual.
 
     Args:
         publications (List[Dict[str, Any]]): List of publications.
         messages_history_all (List[List[Dict[str, str]]]): List of all conversations about all the publications selected
+        publications_per_prompt (int): Number of publications whose topics are extracted together in one conversation.
+        progress_file_name (Optional[str]): Name of the progress file (JSON Lines), None to process all publications
+        without recording the progress.
+
     Returns:
-        List[Dict[str, Any]]: List of publications with "SKGC topics" added.
+        List[Dict[str, Any]]: List of the processed publications with SKGC topics and evaluation results
+        (csoc_topics_ordered, gold_standard_ordered1, gold_standard_ordered2, skgc_topics_ordered, skgc_precision,
+        skgc_recall, skgc_F1, csoc_precision, csoc_recall, csoc_F1) added, without the skipped publications.
+    """
+    logger.info("-" * 160)
+    logger.info("-" * 160)
+    logger.info("Topic extraction and evaluation process")  # In the terminal the user can see the progress of the
+    # extraction and evaluation process
+    # the gold standards and the CSOC results of all publications are normalized together before the evaluation
+    for key in ("gold_standard", "csoc_result"):
+        normalized = normalize_topic_lists([publication[key] for publication in publications])
+        for publication, topics in zip(publications, normalized):
+            publication[key] = topics
+    semaphore = asyncio.Semaphore(get_max_concurrency(len(publications)))
+    messages_history_publications = [list() for _ in publications]  # created upfront so that the order of the
+    # conversations in messages_history_all matches the order of the publications, independent of the order in which
+    # the concurrent conversations finish
+    batch_topics = [None] * len(publications)  # topics extracted together with other publications
+    progress = load_progress(progress_file_name) if progress_file_name is not None else dict()
+    pending = list()  # indices of the publications that are not in the progress file
+    for index, (publication, messages_history) in enumerate(zip(publications, messages_history_publications)):
+        record = progress.get(progress_key(publication))
+        if record is None:
+            pending.append(index)
+        else:
+            publication.update(record["publication"])
+            messages_history.extend(record["messages_history"])
+    if len(pending) < len(publications):
+        logger.info(f"{len(publications) - len(pending)} publications were taken from the progress file "
+                    f"{progress_file_name}.")
+
+    async def process_group(start: int):
+        async with semaphore:
+            indices = pending[start:start + publications_per_prompt]
+            messages_history = list()
+            try:
+                topics = await extract_topics_batch([publications[index] for index in indices], messages_history)
+            except PUBLICATION_ERRORS as e:
+                logger.warning(f"Topic extraction of a group of publications failed ({e}), the topics of the"
+                               f" publications are extracted one by one.")
+                return
+            finally:
+                if _batch_dispatcher is not None:
+                    _batch_dispatcher.end_conversation()
+            for index, group_topics in zip(indices, topics):
+                if group_topics is not None:
+                    batch_topics[index] = group_topics
+                    messages_history_publications[index].extend(messages_history)  # each publication records the
+                    # conversation about its group
+
+    if publications_per_prompt > 1:
+        starts = range(0, len(pending), publications_per_prompt)
+        if _batch_dispatcher is not None:
+            _batch_dispatcher.start_conversations(len(starts))
+        await tqdm_asyncio.gather(*[process_group(start) for start in starts], desc="SKGC topic extraction",
+                                  unit="group")
+
+    async def eval_csoc(publication: Dict[str, Any], csoc_messages_history: List[Dict[str, str]]):
+        try:
+            await eval_csoc_one(publication, csoc_messages_history)
+        finally:
+            if _batch_dispatcher is not None:
+                _batch_dispatcher.end_conversation()
 
+    async def extract_and_eval_skgc(count: int, publication: Dict[str, Any], messages_history: List[Dict[str, str]]):
+        try:
+            context_start = max(len(messages_history), 1)  # a conversation about the group of the publication
+            # is left out in the evaluation, as it is about other publications as well
+            topics = batch_topics[count - 1]
+            if topics is None:
+                logger.debug("-" * 160)
+                logger.debug("-" * 160)
+                logger.debug(f"Publication {str(count)} of {str(len(publications))}: SKGC Topic Extraction")
+                logger.debug("-" * 160)
+                topics = await extract_topics_one(publication, messages_history)
+            publication["skgc_topics"] = topics
+            logger.debug("-" * 160)
+            logger.debug("-" * 160)
+            logger.debug(f"Publication {str(count)} of {str(len(publications))}: Evaluation")
+            logger.debug("-" * 160)
+            await eval_one(publication, messages_history, context_start)
+        finally:
+            if _batch_dispatcher is not None:
+                _batch_dispatcher.end_conversation()
+
+    async def process_one(count: int, publication: Dict[str, Any], messages_history: List[Dict[str, str]]):
+        async with semaphore:
+            csoc_messages_history = list()
+            results = await asyncio.gather(extract_and_eval_skgc(count, publication, messages_history),
+                                           eval_csoc(publication, csoc_messages_history),
+                                           return_exceptions=True)  # the comparison of the CSOC result doesn't depend
+            # on the topic extraction and runs concurrently in its own conversation. Both conversations are finished
+            # even if the other one fails, so that no request is left running after the publication is skipped
+            errors = [result for result in results if isinstance(result, BaseException)]
+            for error in errors:
+                if not isinstance(error, PUBLICATION_ERRORS):
+                    raise error
+            if errors:
+                logger.error(f"Publication {str(count)} of {str(len(publications))} is skipped, as a request to the"
+                             f" OpenAI API failed or its answer couldn't be parsed: {errors[0]!r}")
+                failed.add(count - 1)
+                return
+            messages_history.extend(csoc_messages_history[1:])  # the conversation about the publication continues with
+            # the comparison of the CSOC result, the system message is already the first message
+            if progress_file is not None:  # one complete line per publication, written at once
+                progress_file.write(json.dumps({"publication": publication,
+                                                "messages_history": messages_history}) + "\n")
+
+    if _batch_dispatcher is not None:
+        _batch_dispatcher.start_conversations(2 * len(pending))  # all conversations (topic extraction and evaluation
+        # of the SKGC result, evaluation of the CSOC result) are registered upfront, so that the first batch waits for
+        # the first requests of all publications
+    failed = set()  # indices of the publications that are skipped because of a failed request
+    progress_file = open(progress_file_name, "a", buffering=1, encoding="utf-8") if progress_file_name else None
+    # line-buffered, so that the results of the evaluated publications are on disk if the run is interrupted
+    tasks = [process_one(index + 1, publications[index], messages_history_publications[index]) for index in pending]
+    try:
+        await tqdm_asyncio.gather(*tasks, desc="SKGC", unit="publication")  # one progress bar for all concurrently
+        # processed publications instead of the output of every step (available with --verbose)
+    finally:
+        if progress_file is not None:
+            progress_file.close()
+    if failed:
+        logger.warning(f"{len(failed)} of {len(publications)} publications were skipped because of failed requests or"
+                       f" answers and are left out of the results. Run the program again to process them.")
+    messages_history_all.extend(messages_history for index, messages_history in
+                                enumerate(messages_history_publications) if index not in failed)
+    return [publication for index, publication in enumerate(publications) if index not in failed]
+
+
+def start_background_logging() -> QueueListener:
     """
-    count = 1
-    print("-" * 160)
-    print("-" * 160)
-    print("Topic extraction and evaluation process")  # In the terminal the user can see the progress of the extraction
-    # and evaluation process
-    for publication in publications:
-        print("-" * 160)
-        print("-" * 160)
-        print(f"Publication {str(count)} of {str(len(publications))}: SKGC Topic Extraction")
-        print("-" * 160)
-        messages_history = list()
-        skgc_topics = extract_topics_one(publication, messages_history)
-        publication["skgc_topics"] = skgc_topics
-        messages_history_all.append(messages_history)
-        count += 1
-    return publications
+    Moves the output of the log records to a background thread. While the publications are processed concurrently,
+    the logger only puts the log records into a queue, and the background thread writes them to the console. Thus, the
+    event loop isn't blocked by the console output.
 
+    Returns:
+        listener (QueueListener): The started listener that writes the log records of the queue.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, _console_handler)
+    logger.removeHandler(_console_handler)
+    logger.addHandler(QueueHandler(log_queue))
+    listener.start()
+    return listener
 
-def eval_all(publications_and_topics: List[Dict[str, Any]], messages_history_all: List[List[Dict[str, str]]]) -> List[
-             Dict[str, Any]]:
+
+def stop_background_logging(listener: QueueListener):
+    """
+    Writes the remaining log records of the queue and moves the output of the log records back to the calling thread,
+    so that later output (e.g. the questions to the user) isn't mixed up with the output of the pipeline.
+
+    Args:
+        listener (QueueListener): The listener returned by start_background_logging.
+    """
+    listener.stop()
+    for handler in list(logger.handlers):
+        if isinstance(handler, QueueHandler):
+            logger.removeHandler(handler)
+    logger.addHandler(_console_handler)
+
+
+def get_max_concurrency(num_publications: int) -> int:
+    """
+    Returns the number of publications that are processed concurrently. With the Batch API, all publications are
+    processed concurrently so that their requests are sent in the same batches.
+
+    Args:
+        num_publications (int): The number of publications to process.
+
+    Returns:
+        int: The maximum number of concurrently processed publications.
     """
-    Evaluate all produced results (i.e. the extracted SKGC topics).
-    Evaluation against Gold Standard and comparison with CSOC result.
+    if _batch_dispatcher is not None:
+        return max(num_publications, 1)
+    return MAX_CONCURRENCY
+
+
+async def run_pipeline(publications: List[Dict[str, Any]], messages_history_all: List[List[Dict[str, str]]],
+                       use_batch_api: bool = False, publications_per_prompt: int = 1,
+                       progress_file_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Runs the topic extraction and the evaluation for all publications in one event loop and closes the OpenAI
+    clients afterwards.
 
     Args:
-        publications_and_topics (List[Dict[str, Any]]): List of publications with extracted SKGC topics.
+        publications (List[Dict[str, Any]]): List of publications.
         messages_history_all (List[List[Dict[str, str]]]): List of all conversations about all the publications selected
+        use_batch_api (bool): Whether the requests are sent in waves to the Batch API of OpenAI instead of one by one.
+        publications_per_prompt (int): Number of publications whose topics are extracted together in one conversation.
+        progress_file_name (Optional[str]): Name of the progress file (JSON Lines) to resume an interrupted run, None to
+        process all publications.
 
     Returns:
-        List[Dict[str, Any]]: List of publications with SKGC topics and evaluation results (csoc_topics_ordered,
-        gold_standard_ordered1, gold_standard_ordered2, skgc_topics_ordered, skgc_precision, skgc_recall, skgc_F1,
-        csoc_precision, csoc_recall, csoc_F1) added.
+        List[Dict[str, Any]]: List of publications with SKGC topics and evaluation results added.
+    """
+    global _batch_dispatcher
+    if use_batch_api:
+        _batch_dispatcher = BatchDispatcher()
+    listener = start_background_logging()
+    try:
+        # topic extraction and evaluation of each publication in one conversation
+        return await extract_topics_and_eval_all(publications, messages_history_all, publications_per_prompt,
+                                                 progress_file_name)
+    finally:
+        _batch_dispatcher = None
+        await close_openai_clients()
+        stop_background_logging(listener)
 
+
+def harmonic_mean_of_valid(values: np.ndarray) -> float:
     """
-    count = 0
-    for publication in publications_and_topics:
-        print("-" * 160)
-        print("-" * 160)
-        print(f"Publication {str(count+1)} of {str(len(publications_and_topics))}: Evaluation")  # In the terminal the
-        # user can see the progress of the extraction and evaluation process
-        print("-" * 160)
-        eval_one(publication, messages_history_all[count])
-        count += 1
-    return publications_and_topics
+    Computes the harmonic mean of the evaluation metrics of all publications. Incorrect evaluations (value of -1) are
+    left out. If a correct value is 0, the harmonic mean is 0.
+
+    Args:
+        values (np.ndarray): The precision, recall or F1 values of all publications.
+
+    Returns:
+        float: The harmonic mean of the correct values, or -1 if no value is correct.
+    """
+    valid = values[values >= 0]
+    if valid.size == 0:
+        return -1
+    if not valid.all():  # the reciprocal of 0 is infinite
+        return 0.0
+    return float(valid.size / np.reciprocal(valid).sum())
 
 
 def print_eval_details(publications_and_topics: List[Dict[str, Any]]):
     """
         Prints evaluation details to console, and - if requested by the user - additionally stores the evaluation
-        in a txt-file.
+        in a txt-file. The report is collected in memory and written at once to the console and the file, instead of
+        writing and flushing every line.
 
         Args:
             publications_and_topics (List[Dict[str, Any]]): List of publications with the extraction and evaluation
@@ -685,26 +1699,28 @@ def print_eval_details(publications_and_topics: List[Dict[str, Any]]):
             break
         elif choice.upper() == "B":
             file_bool = False
-            file_name = "file_name.txt"
             break
         else:
             print("Invalid input. Please enter 'A' or 'B'")
 
-    with open(file_name, 'w') as file:
-        if file_bool:
-            dual_output = DualOutput(file)
-            sys.stdout = dual_output  # "print" function will output the given strings both to the console and to
-            # the given file
+    report = io.StringIO()
+    report_handler = logging.StreamHandler(report)  # collects the log records of the report, which is then written
+    # both to the console and to the given file
+    logger.removeHandler(_console_handler)
+    logger.addHandler(report_handler)
+    try:
         count = 1
-        print("-" * 160)
-        print("Evaluation details:")
-        for publication in publications_and_topics:
-            print("-" * 160)
-            print(f"Publication {str(count)} of {str(len(publications_and_topics))}:")
+        metrics = np.empty((6, len(publications_and_topics)), dtype=np.float64)  # precision, recall and F1 of SKGC and
+        # CSOC of each publication, filled while the publications are printed and used for the overall means
+        logger.info("-" * 160)
+        logger.info("Evaluation details:")
+        for index, publication in enumerate(publications_and_topics):
+            logger.info("-" * 160)
+            logger.info(f"Publication {str(count)} of {str(len(publications_and_topics))}:")
             count += 1
-            print()
-            print(f"Publication title: {publication['title']}")
-            print()
+            logger.info("")
+            logger.info(f"Publication title: {publication['title']}")
+            logger.info("")
             skgc_topics = publication["skgc_topics_ordered"]
             gold_standard_order1 = publication["gold_standard_ordered1"]  # gold standard is ordered twice: First in
             # comparison with the SKGC result (gold_standard_ordered1) and second in comparison with the CSOC result
@@ -719,83 +1735,64 @@ def print_eval_details(publications_and_topics: List[Dict[str, Any]]):
             csoc_precision = publication["csoc_precision"]
             csoc_recall = publication["csoc_recall"]
             csoc_f1 = publication["csoc_f1"]
-            max_len = max(len(skgc_topics), len(gold_standard_order1), len(gold_standard_order2), len(csoc_result))
-            print(
-                f"{'SKGC Topics':<40} {'Gold Standard (Order 1)':<40} {'Gold Standard (Order 2)':<40}"
-                f" {'CSOC Topics':<40}")  # table format with 4 columns of 40 characters length
-
-            print("-" * 160)
-
-            for i in range(max_len):
-                skgc_topic = skgc_topics[i] if i < len(skgc_topics) else ''
-                gold_standard_topic1 = gold_standard_order1[i] if i < len(gold_standard_order1) else ''
-                gold_standard_topic2 = gold_standard_order2[i] if i < len(gold_standard_order2) else ''
-                csoc_topic = csoc_result[i] if i < len(csoc_result) else ''
-                print(f"{skgc_topic:<40} {gold_standard_topic1:<40} {gold_standard_topic2:<40} {csoc_topic:<40}")
-                print("-" * 160)
-            print(f"{f'Precision: {skgc_precision}':<40} {'':<40} {'':<40} {f'Precision: {csoc_precision}':<40}")
-            print("-" * 160)
-            print(f"{f'Recall: {skgc_recall}':<40} {'':<40} {'':<40} {f'Recall: {csoc_recall}':<40}")
-            print("-" * 160)
-            print(f"{f'F1: {skgc_f1}':<40} {'':<40} {'':<40} {f'F1: {csoc_f1}':<40}")
+            metrics[:, index] = (skgc_precision, csoc_precision, skgc_recall, csoc_recall, skgc_f1, csoc_f1)
+            table = [REPORT_TABLE_HEADER]  # the table of a publication is written as one log record
+            for row in zip_longest(skgc_topics, gold_standard_order1, gold_standard_order2, csoc_result,
+                                   fillvalue=''):  # one row per position, the shorter lists are filled up with empty
+                # cells
+                table.append(REPORT_ROW_FORMAT.format(*row))
+                table.append(REPORT_DIVIDER)
+            table.append(REPORT_ROW_FORMAT.format(f"Precision: {skgc_precision}", "", "",
+                                                  f"Precision: {csoc_precision}"))
+            table.append(REPORT_DIVIDER)
+            table.append(REPORT_ROW_FORMAT.format(f"Recall: {skgc_recall}", "", "", f"Recall: {csoc_recall}"))
+            table.append(REPORT_DIVIDER)
+            table.append(REPORT_ROW_FORMAT.format(f"F1: {skgc_f1}", "", "", f"F1: {csoc_f1}"))
+            logger.info("\n".join(table))
         # Calculation of the overall mean of the precision, recall and F1 mean of each SKGC and CSOC
-        print()
-        print("-" * 160)
-        print("Overall comparison between SKGC and CSOC: Precision mean comparison")
-        precision_list_skgc = list()
-        precision_list_csoc = list()
-        for publication in publications_and_topics:
-            precision_list_skgc.append(publication["skgc_precision"])
-            precision_list_csoc.append(publication["csoc_precision"])
-        precision_mean_skgc = hmean(precision_list_skgc)  # average of means
-        precision_mean_csoc = hmean(precision_list_csoc)  # average of means
-        print(f"Precision mean of SKGC appproach: {str(precision_mean_skgc)}")
-        print(f"Precision mean of CSOC appproach: {str(precision_mean_csoc)}")
-        print("-" * 160)
-        print("Overall comparison between SKGC and CSOC: Recall mean comparison")
-        recall_list_skgc = list()
-        recall_list_csoc = list()
-        for publication in publications_and_topics:
-            recall_list_skgc.append(publication["skgc_recall"])
-            recall_list_csoc.append(publication["csoc_recall"])
-        recall_mean_skgc = hmean(recall_list_skgc)  # average of means
-        recall_mean_csoc = hmean(recall_list_csoc)  # average of means
-        print(f"Recall mean of SKGC appproach: {str(recall_mean_skgc)}")
-        print(f"Recall mean of CSOC appproach: {str(recall_mean_csoc)}")
-        print("-" * 160)
-        print("Overall comparison between SKGC and CSOC: F1 mean comparison")
-        f1_list_skgc = list()
-        f1_list_csoc = list()
-        for publication in publications_and_topics:
-            f1_list_skgc.append(publication["skgc_f1"])
-            f1_list_csoc.append(publication["csoc_f1"])
-
-        if all(x >= 0 for x in f1_list_skgc):
-            f1_mean_skgc = hmean(f1_list_skgc)  # average of means
-        else:
-            f1_mean_skgc = -1
-            print("Error: Overall evaluation partly failed. F1 value of -1 means incorrect evaluation")
-        if all(x >= 0 for x in f1_list_csoc):
-            f1_mean_csoc = hmean(f1_list_csoc)  # average of means
-        else:
-            f1_mean_csoc = -1
-            print("Error: Overall evaluation partly failed. F1 value of -1 means incorrect evaluation")
-        print(f"F1 mean of SKGC appproach: {str(f1_mean_skgc)}")
-        print(f"F1 mean of CSOC appproach: {str(f1_mean_csoc)}")
-        print("-" * 160)
+        logger.info("")
+        logger.info("-" * 160)
+        logger.info("Overall comparison between SKGC and CSOC: Precision mean comparison")
+        precision_skgc, precision_csoc, recall_skgc, recall_csoc, f1_skgc, f1_csoc = metrics
+        precision_mean_skgc = harmonic_mean_of_valid(precision_skgc)  # average of means
+        precision_mean_csoc = harmonic_mean_of_valid(precision_csoc)  # average of means
+        logger.info(f"Precision mean of SKGC appproach: {str(precision_mean_skgc)}")
+        logger.info(f"Precision mean of CSOC appproach: {str(precision_mean_csoc)}")
+        logger.info("-" * 160)
+        logger.info("Overall comparison between SKGC and CSOC: Recall mean comparison")
+        recall_mean_skgc = harmonic_mean_of_valid(recall_skgc)  # average of means
+        recall_mean_csoc = harmonic_mean_of_valid(recall_csoc)  # average of means
+        logger.info(f"Recall mean of SKGC appproach: {str(recall_mean_skgc)}")
+        logger.info(f"Recall mean of CSOC appproach: {str(recall_mean_csoc)}")
+        logger.info("-" * 160)
+        logger.info("Overall comparison between SKGC and CSOC: F1 mean comparison")
+        for f1_values in (f1_skgc, f1_csoc):  # the F1 value is -1 if the precision or the recall is -1
+            if (f1_values < 0).any():
+                logger.error("Error: Overall evaluation partly failed. Publications with incorrect evaluation (value"
+                             " of -1) are left out of the means, a mean of -1 means that no evaluation was correct")
+        f1_mean_skgc = harmonic_mean_of_valid(f1_skgc)  # average of means
+        f1_mean_csoc = harmonic_mean_of_valid(f1_csoc)  # average of means
+        logger.info(f"F1 mean of SKGC appproach: {str(f1_mean_skgc)}")
+        logger.info(f"F1 mean of CSOC appproach: {str(f1_mean_csoc)}")
+        logger.info("-" * 160)
         if f1_mean_skgc > f1_mean_csoc:  # Depending on the F1 overall mean comparison, a final conclusion statement is
             # printed
-            print("According to the automatic evaluation, the SKGC approach yielded better results than the CSOC"
-                  " approach.")
+            logger.info("According to the automatic evaluation, the SKGC approach yielded better results than the CSOC"
+                        " approach.")
         elif f1_mean_skgc < f1_mean_csoc:
-            print("According to the automatic evaluation, the CSOC approach yielded better results than the SKGC"
-                  " approach.")
+            logger.info("According to the automatic evaluation, the CSOC approach yielded better results than the SKGC"
+                        " approach.")
         else:
-            print("According to the automatic evaluation, the SKGC and the CSOC approach performed overall"
-                  " identically.")
+            logger.info("According to the automatic evaluation, the SKGC and the CSOC approach performed overall"
+                        " identically.")
+    finally:
+        logger.removeHandler(report_handler)
+        logger.addHandler(_console_handler)
+        _console_handler.stream.write(report.getvalue())
+        _console_handler.flush()
         if file_bool:
-            # Restore the original stdout
-            sys.stdout = dual_output.console
+            with open(file_name, 'w') as file:
+                file.write(report.getvalue())
 
 
 def skgc_topics_and_eval_to_json(publications_and_topics: List[Dict[str, Any]]):
@@ -819,9 +1816,297 @@ def skgc_topics_and_eval_to_json(publications_and_topics: List[Dict[str, Any]]):
             print(f"Error writing to file {file_name}: {e}")
 
 
-def query_gpt_agent(prompt: str, messages_history: List[Dict[str, str]]) -> str:
+def get_openai_client(api_key_name: str) -> AsyncOpenAI:
+    """
+    Returns the OpenAI client for the given API key. The client is created on first use and then reused for all
+    further calls with the same API key, also by the conversations about different publications that run concurrently.
+    All clients share one pooled HTTP client with keep-alive connections. If OPENAI_BASE_URL is set, the clients send
+    the requests to that OpenAI-compatible server, and the API key and the organization are optional.
+
+    Args:
+        api_key_name (str): The name of the environment variable containing the API key (API_KEY_AGENT or
+        API_KEY_ASSISTANT).
+
+    Returns:
+        client (AsyncOpenAI): The OpenAI client for the given API key.
+    """
+    global _http_client
+    if api_key_name not in _openai_clients:
+        api_key = os.getenv(api_key_name)
+        if not api_key:
+            if BASE_URL is None:
+                raise ValueError(f"API key not found. Please set the {api_key_name} environment variable.")
+            api_key = "none"  # local servers ignore the API key, but the OpenAI client requires one
+
+        organization = os.getenv("ORGANIZATION") or None  # the ORGANIZATION ID must be stored in the .env file.
+        if not organization and BASE_URL is None:
+            raise ValueError("Organization for OpenAI access not found. Please set the ORGANIZATION environment"
+                             " variable.")
+
+        if _http_client is None:
+            _http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        _openai_clients[api_key_name] = AsyncOpenAI(
+            organization=organization,
+            api_key=api_key,
+            base_url=BASE_URL,  # None for the OpenAI API
+            http_client=_http_client,
+            max_retries=0  # failed requests are retried by retry_with_backoff
+        )
+    return _openai_clients[api_key_name]
+
+
+async def close_openai_clients():
+    """
+    Closes all OpenAI clients that were created during the run and the HTTP client they share.
+
+    Returns:
+        None
+    """
+    global _http_client
+    _openai_clients.clear()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def parse_duration(duration: str) -> float:
+    """
+    Converts a duration in the format of the x-ratelimit-reset-* headers of the OpenAI API (e.g. "1s", "6m0s",
+    "20ms") to seconds.
+
+    Args:
+        duration (str): The duration.
+
+    Returns:
+        float: The duration in seconds.
+    """
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(value) * units[unit] for value, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", duration))
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_encoding(model: str) -> Optional[tiktoken.Encoding]:
+    """
+    Returns the tokenizer of a model. Each tokenizer is loaded only once, further calls return the same tokenizer.
+
+    Args:
+        model (str): The OpenAI model.
+
+    Returns:
+        Optional[tiktoken.Encoding]: The tokenizer of the model, the tokenizer of the GPT-4o models for models unknown
+        to tiktoken, or None if the tokenizer can't be loaded (tiktoken downloads the vocabulary on first use).
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:  # model unknown to tiktoken
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"Warning: The tokenizer for {model} couldn't be loaded ({e}). The tokens are estimated from the"
+                       f" number of characters instead.")
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def count_tokens(text: str, model: str) -> int:
+    """
+    Counts the tokens of a text with the tokenizer of the model. The counts are cached, as every request of a
+    conversation contains the earlier messages again (e.g. the system message and the examples of the first prompt).
+
+    Args:
+        text (str): The text to count the tokens of.
+        model (str): The OpenAI model whose tokenizer is used, the tokenizer must be available.
+
+    Returns:
+        int: The number of tokens.
+    """
+    return len(get_token_encoding(model).encode(text))
+
+
+def estimate_tokens(messages: List[Dict[str, str]], model: str = MODEL_HEAVY) -> int:
+    """
+    Counts the tokens of the messages of a request with the tokenizer of the model, including the tokens that the
+    chat format adds per message and for the start of the response. If the tokenizer isn't available, about four
+    characters per token are assumed (English text).
+
+    Args:
+        messages (List[Dict[str, str]]): The messages of the request.
+        model (str): The OpenAI model of the request.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    if get_token_encoding(model) is None:
+        return sum(len(message["content"]) for message in messages) // 4 + 1
+    return sum(count_tokens(message["content"], model) + 3 for message in messages) + 3
+
+
+def get_retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Returns the waiting time before the next attempt of a failed request. If the response contains a Retry-After
+    header, its value is used. Otherwise, the waiting time grows exponentially with the number of attempts, with random
+    jitter so that concurrently failing requests are not retried at the same time.
+
+    Args:
+        error (Exception): The error of the failed attempt.
+        attempt (int): The number of the failed attempt, starting with 0.
+
+    Returns:
+        float: The waiting time in seconds.
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        if "retry-after-ms" in response.headers:
+            return float(response.headers["retry-after-ms"]) / 1000
+        if "retry-after" in response.headers and response.headers["retry-after"].isdigit():
+            return float(response.headers["retry-after"])
+    return random.uniform(0, min(RETRY_MAX_WAIT, 2 ** attempt))
+
+
+def retry_with_backoff(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Decorator that retries a request to the OpenAI API up to RETRY_ATTEMPTS times if it fails because of a transient
+    error (rate limit, connection problem, also while a response is streamed, or server error), waiting between the
+    attempts (see get_retry_delay).
+
+    Args:
+        func (Callable[..., Awaitable[Any]]): The coroutine function that sends the request.
+
+    Returns:
+        wrapper (Callable[..., Awaitable[Any]]): The decorated coroutine function.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                return await func(*args, **kwargs)
+            except (RateLimitError, APIConnectionError, InternalServerError, httpx.TransportError) as e:
+                if attempt == RETRY_ATTEMPTS - 1:
+                    raise
+                delay = get_retry_delay(e, attempt)
+                logger.warning(f"Request to the OpenAI API failed ({e}). Retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+    return wrapper
+
+
+@cached
+@retry_with_backoff
+async def create_chat_completion(client: AsyncOpenAI, messages: List[Dict[str, str]], model: str = MODEL_HEAVY,
+                                 max_tokens: int = 800, temperature: float = 0, seed: int = 4,
+                                 response_format: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Sends a request to the chat completions API of OpenAI. The request (model, messages, temperature and seed) is
+    looked up in the response cache first, the API is only called if the request isn't cached. Only complete responses
+    (finish reason "stop") are stored in the response cache. If the pipeline runs
+    with the Batch API, the request is sent with the next batch. Otherwise, the request waits only if the rate limits
+    reported by the former responses would be surpassed, and the response is streamed and collected chunk by chunk.
+
+    Args:
+        client (AsyncOpenAI): The OpenAI client to use (agent or assistant).
+        messages (List[Dict[str, str]]): The messages of the conversation including the new prompt.
+        model (str): The OpenAI model (MODEL_HEAVY or MODEL_LIGHT).
+        max_tokens (int): The maximum number of tokens of the response. As the requested tokens count towards the TPM
+        limit, it is set according to the expected length of the response.
+        temperature (float): The temperature was set to 0 according to OpenAI guidelines for minimizing
+        non-determinism (https://platform.openai.com/docs/guides/text-generation/reproducible-outputs and
+        https://help.openai.com/en/articles/6654000-best-practices-for-prompt-engineering-with-the-openai-api)
+        seed (int): Use of seed parameter to promote reproducible outputs
+        (https://platform.openai.com/docs/guides/text-generation/reproducible-outputs)
+        response_format (Optional[Dict[str, Any]]): The required format of the response (JSON_RESPONSE_FORMAT or
+        MATCHING_TOPICS_RESPONSE_FORMAT), None for text.
+
+    Returns:
+        response (str): The response from the API.
+    """
+    # messages format according to the OpenAI API reference: https://platform.openai.com/docs/api-reference/
+    request = {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature,
+               "seed": seed}
+    if response_format is not None:
+        request["response_format"] = response_format
+    if _batch_dispatcher is not None:
+        return await _batch_dispatcher.submit(client, request)
+    if model not in _rate_limiters:
+        _rate_limiters[model] = RateLimiter(RPM_LIMIT, TPM_LIMIT)
+    rate_limiter = _rate_limiters[model]
+    reservation = await rate_limiter.wait(estimate_tokens(messages, model) + max_tokens)
+    raw_response = await client.chat.completions.with_raw_response.create(**request, stream=True,
+                                                                         stream_options={"include_usage": True})
+    rate_limiter.update(raw_response.headers)
+    stream = raw_response.parse()  # the raw response is parsed synchronously, only the stream itself is asynchronous
+    response = list()
+    finish_reason = None
+    async for chunk in stream:  # the response is streamed, so that the connection doesn't idle until the whole
+        # answer is generated
+        if chunk.choices and chunk.choices[0].delta.content:
+            response.append(chunk.choices[0].delta.content)
+        if chunk.choices and chunk.choices[0].finish_reason:
+            finish_reason = chunk.choices[0].finish_reason
+            if finish_reason == "length":
+                logger.warning(f"Warning: The response was cut off after the maximum number of {max_tokens} tokens.")
+        if chunk.usage:  # the last chunk contains the usage of the whole request
+            rate_limiter.record_usage(reservation, chunk.usage.total_tokens)
+    response = "".join(response).strip()
+    if finish_reason != "stop":  # cut off or incomplete responses are returned, but not stored in the response cache
+        return UncachedResponse(response)
+    return response
+
+
+@retry_with_backoff
+async def create_embedding(client: AsyncOpenAI, text: str) -> List[float]:
+    """
+    Computes the embedding of a text with the embeddings API of OpenAI.
+
+    Args:
+        client (AsyncOpenAI): The OpenAI client to use.
+        text (str): The text to embed.
+
+    Returns:
+        embedding (List[float]): The embedding of the text.
+    """
+    response = await client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+    return response.data[0].embedding
+
+
+async def compact_context(messages: List[Dict[str, str]], model: str = MODEL_HEAVY) -> List[Dict[str, str]]:
     """
-    Queries the GPT Agent API (OpenAI model gpt-4o) with the provided prompt.
+    Replaces the older turns of a request to the GPT agent by a summary of the smaller model, if the request is longer
+    than COMPACT_TOKENS. The system message, the last turn and the new prompt are kept as they are. Only the request is
+    compacted, the messages history stays complete. The summary is a request like any other and is therefore cached,
+    so re-runs compact the same turns with the same summary.
+
+    Args:
+        messages (List[Dict[str, str]]): The messages of the request, starting with the system message and ending with
+        the new prompt.
+        model (str): The OpenAI model of the request, used to count the tokens.
+
+    Returns:
+        List[Dict[str, str]]: The compacted messages, or the given messages if they are short enough or the summary
+        failed.
+    """
+    older_turns = messages[1:-3]  # the last answer of the GPT agent and its prompt stay, as the new prompt refers to it
+    if COMPACT_TOKENS is None or not older_turns or estimate_tokens(messages, model) <= COMPACT_TOKENS:
+        return messages
+    client = get_openai_client("API_KEY_AGENT")
+    request = [{"role": "system", "content": f"Summarize the following conversation in at most "
+                                             f"{COMPACT_SUMMARY_TOKENS} tokens. Preserve all extracted keywords and "
+                                             f"ordered lists word for word."},
+               {"role": "user", "content": json.dumps(older_turns)}]
+    try:
+        summary = await create_chat_completion(client, messages=request, model=MODEL_LIGHT,
+                                               max_tokens=COMPACT_SUMMARY_TOKENS)
+    except (APIError, httpx.TransportError) as e:  # failed requests (after the retries), programming errors are raised
+        logger.warning(f"Error summarizing the conversation, the complete conversation is sent: {e}")
+        return messages
+    logger.debug(f"Replaced {len(older_turns)} messages of the conversation by a summary.")
+    summary_message = {"role": "system", "content": f"Summary of the conversation so far: {summary}"}
+    return messages[:1] + [summary_message] + messages[-3:]
+
+
+async def query_gpt_agent(prompt: str, messages_history: List[Dict[str, str]], model: str = MODEL_HEAVY,
+                          max_tokens: int = 800, context_start: int = 1,
+                          response_format: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Queries the GPT Agent API with the provided prompt.
 
     Args:
         prompt (str): The prompt to send to the API.
@@ -830,35 +2115,23 @@ def query_gpt_agent(prompt: str, messages_history: List[Dict[str, str]]) -> str:
         with the GPT assistant that is only used to check the correctness of the output format of the GPT agent's
         answers. The Open AI API currently doesn't store the history itself
         ( https://platform.openai.com/docs/guides/text-generation/chat-completions-api).
+        model (str): The OpenAI model, MODEL_HEAVY for reasoning steps and MODEL_LIGHT for simpler steps.
+        max_tokens (int): The maximum number of tokens of the response.
+        context_start (int): Index of the first message after the system message that is sent to the API. Earlier
+        messages stay in the messages history, but are left out of the request if the current step doesn't need them,
+        as every message of the context counts towards the TPM limit and increases the latency.
+        response_format (Optional[Dict[str, Any]]): The required format of the response (JSON_RESPONSE_FORMAT or
+        MATCHING_TOPICS_RESPONSE_FORMAT), None for text.
 
     Returns:
         response (str): The response from the API.
     """
-    time.sleep(10)  # waiting time was added to not surpass the TPM (tokens per minute) limit of the OpenAI API.
-    # 10s waiting time was calculated based on the TPM limit for usage tier 1 of the GPT-4o model as of May 31st 2024,
-    # which was 30,000. The message_history at the end of the extraction and evaluation pipeline in the present use case
-    # is 4,500-5,500 tokens, former message_history objects are smaller, which is why 10s waiting time was chosen as a
-    # safe limit. As the API usage tiers are assigned by OpenAI on organization level according to the API use, the
-    # number of seconds can be adjusted according to the usage tier of the user's organization. Usage tier 2 for example
-    # allows for 450,000 TPM which would enable to reduce the waiting time to 1s to be on the safe side.
-
-    api_key = os.getenv("API_KEY_AGENT")  # the API_KEY_AGENT must be stored in the .env file.
+    client = get_openai_client("API_KEY_AGENT")  # the API_KEY_AGENT must be stored in the .env file.
     # For this implementation it was decided to use two OpenAI keys, one for the agent role that accomplishes the
     # extraction and evaluation tasks, and one for the assistant role that checks the output of the agent for formal
     # correctness. As per current status, the conversation history is not stored using the OpenAI API (differently than
     # using ChatGPT). However, in case of future changes and also for clear delineation between the agent and assistant
     # role, two different API keys and functions are used.
-    if not api_key:
-        raise ValueError("API key not found. Please set the API_KEY_AGENT environment variable.")
-
-    organization = os.getenv("ORGANIZATION")  # the ORGANIZATION ID must be stored in the .env file.
-    if not organization:
-        raise ValueError("Organization for OpenAI access not found. Please set the ORGANIZATION environment variable.")
-
-    client = OpenAI(
-        organization=organization,
-        api_key=api_key
-    )
 
     messages_history.append({"role": "user", "content": prompt})  # GPT agent messages history regarding the topic
     # extraction and evaluation of the current publication. The messages history contains only the messages with the GPT
@@ -866,31 +2139,21 @@ def query_gpt_agent(prompt: str, messages_history: List[Dict[str, str]]) -> str:
     # agent's answers. The Open AI API currently doesn't store the history itself
     # ( https://platform.openai.com/docs/guides/text-generation/chat-completions-api).
     # messages format according to the OpenAI API reference: https://platform.openai.com/docs/api-reference/
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",  # GPT-4o was chosen as the most recently published model at the time of creating of this
-            # script (mid to end of May 2024). According to the announcement of OpenAI, GPT-4o "achieves
-            # GPT-4 Turbo-level performance on text, reasoning, and coding intelligence", is faster and cheaper in use
-            # than GPT-4 Turbo.
-
-            messages=messages_history,
-            temperature=0,  # temperature was set to 0 according to OpenAI guidelines for minimizing non-determinism
-            # (https://platform.openai.com/docs/guides/text-generation/reproducible-outputs and
-            # https://help.openai.com/en/articles/6654000-best-practices-for-prompt-engineering-with-the-openai-api)
-            seed=4  # use of seed parameter to promote reproducible outputs
-            # (https://platform.openai.com/docs/guides/text-generation/reproducible-outputs)
-        )
-        response = response.choices[0].message.content.strip()
-        return response
-
-    except Exception as e:
-        print(f"Error querying OpenAI API: {e}")
-        return ""
+    messages = messages_history[:1] + messages_history[context_start:]  # system message and the needed context
+    messages = await compact_context(messages, model)
+    response = await create_chat_completion(client, messages=messages, model=model, max_tokens=max_tokens,
+                                            response_format=response_format)  # transient errors are retried by
+    # retry_with_backoff, other errors are raised, so that the publication is skipped instead of being evaluated with
+    # an empty answer
+    return response
 
 
-def query_gpt_assistant(prompt: str) -> str:
+async def query_gpt_assistant(prompt: str) -> str:
     """
-    Queries the GPT Assistant API (OpenAI model gpt-4o) with the provided prompt.
+    Queries the GPT Assistant API with the provided prompt. As the GPT assistant only corrects the output format of the
+    GPT agent's answers, the smaller model MODEL_LIGHT is used. With the Batch API, the request is sent in the same wave
+    as the requests of the other conversations. It can't be deferred beyond that, as the next prompt to the GPT agent
+    contains the corrected answer.
 
     Args:
         prompt (str): The prompt to send to the API.
@@ -898,75 +2161,41 @@ def query_gpt_assistant(prompt: str) -> str:
     Returns:
         response (str): The response from the API.
     """
-    time.sleep(10)  # waiting time was added to not surpass the TPM (tokens per minute) limit of the OpenAI API.
-    # 10s waiting time was calculated based on the TPM limit for usage tier 1 of the GPT-4o model as of May 31st 2024,
-    # which was 30,000. The message_history at the end of the extraction and evaluation pipeline in the present use case
-    # is 4,500-5,500 tokens, former message_history objects are smaller, which is why 10s waiting time was chosen as a
-    # safe limit. As the API usage tiers are assigned by OpenAI on organization level according to the API use, the
-    # number of seconds can be adjusted according to the usage tier of the user's organization. Usage tier 2 for example
-    # allows for 450,000 TPM which would enable to reduce the waiting time to 1s to be on the safe side.
-
-    api_key = os.getenv("API_KEY_ASSISTANT")  # the API_KEY_ASSISTANT must be stored in the .env file.
+    client = get_openai_client("API_KEY_ASSISTANT")  # the API_KEY_ASSISTANT must be stored in the .env file.
     # For this implementation it was decided to use two OpenAI keys, one for the agent role that accomplishes the
     # extraction and evaluation tasks, and one for the assistant role that checks the output of the agent for formal
     # correctness. As per current status, the conversation history is not stored using the OpenAI API (differently than
     # using ChatGPT). However, in case of future changes and also for clear delineation between the agent and assistant
     # role, two different API keys and functions are used.
 
-    if not api_key:
-        raise ValueError("API key not found. Please set the API_KEY_ASSISTANT environment variable.")
-
-    organization = os.getenv("ORGANIZATION")  # the ORGANIZATION ID must be stored in the .env file.
-    if not organization:
-        raise ValueError("Organization for OpenAI access not found. Please set the ORGANIZATION environment variable.")
-
-    client = OpenAI(
-        organization=organization,
-        api_key=api_key
-    )
-
     messages = list()
     messages.append({"role": "system", "content": "Hello GPT, you are my very helpful and intelligent assistant for"
                                                   "checking the answers of another GPT sister of yourself."})
     messages.append({"role": "user", "content": prompt})
     # messages format according to the OpenAI API reference: https://platform.openai.com/docs/api-reference/
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",  # GPT-4o was chosen as the most recently published model at the time of creating of this
-            # script (mid to end of May 2024). According to the announcement of OpenAI, GPT-4o "achieves
-            # GPT-4 Turbo-level performance on text, reasoning, and coding intelligence", is faster and cheaper in use
-            # than GPT-4 Turbo.
-            messages=messages,
-            temperature=0,  # temperature was set to 0 according to OpenAI guidelines for minimizing non-determinism
-            # (https://platform.openai.com/docs/guides/text-generation/reproducible-outputs and
-            # https://help.openai.com/en/articles/6654000-best-practices-for-prompt-engineering-with-the-openai-api)
-            seed=4  # use of seed parameter to promote reproducible outputs
-            # (https://platform.openai.com/docs/guides/text-generation/reproducible-outputs)
-        )
-        response = response.choices[0].message.content.strip()
-        return response
-    except Exception as e:
-        print(f"Error querying OpenAI API: {e}")
-        return ""
+    response = await create_chat_completion(client, messages=messages, model=MODEL_LIGHT)  # errors are raised as in
+    # query_gpt_agent
+    return response
 
 
-def load_prompts_from_yaml(file_name: str) -> List[str]:
+@functools.lru_cache(maxsize=None)
+def load_prompts_from_yaml(file_name: str) -> Tuple[str, ...]:
     """
-    Load prompts from a YAML file.
+    Load prompts from a YAML file. Each file is parsed only once, further calls return the same prompts.
 
     Args:
         file_name (str): The name of the YAML file containing the prompts.
 
     Returns:
-        prompts (List [str]): A list of prompts.
+        prompts (Tuple[str, ...]): A tuple of prompts.
     """
     file_path = os.path.join(os.path.dirname(__file__), file_name)
-    prompts = list()
+    prompts = tuple()
     try:
         with open(file_path, 'r') as file:
             prompts_yaml = yaml.safe_load(file)
-            prompts = [prompt.strip() for prompt in prompts_yaml]
+            prompts = tuple(prompt.strip() for prompt in prompts_yaml)
         return prompts
 
     except FileNotFoundError as fnf_error:
@@ -982,6 +2211,34 @@ def load_prompts_from_yaml(file_name: str) -> List[str]:
         return prompts
 
 
+def to_format_template(prompt: str) -> str:
+    """
+    Converts a prompt with placeholders in the format XXXnameXXX into a template for str.format_map with placeholders
+    in the format {name}, so that all placeholders of a prompt are filled in one pass. Braces that are part of the
+    prompt text are escaped.
+
+    Args:
+        prompt (str): The prompt with XXXnameXXX placeholders.
+
+    Returns:
+        template (str): The template with {name} placeholders.
+    """
+    template = prompt.replace("{", "{{").replace("}", "}}")
+    return re.sub(r"XXX(\w+?)XXX", r"{\1}", template)
+
+
+# The prompts are loaded and converted into templates once when the script is started instead of once per publication
+PROMPTS_GPT_AGENT = tuple(map(to_format_template, load_prompts_from_yaml("prompts_gpt_agent.yaml")))
+PROMPTS_GPT_AGENT_BATCH = tuple(map(to_format_template, load_prompts_from_yaml("prompts_gpt_agent_batch.yaml")))
+PROMPTS_GPT_ASSISTANT = tuple(map(to_format_template, load_prompts_from_yaml("prompts_gpt_assistant.yaml")))
+PROMPTS_GPT_AGENT_EVAL = tuple(map(to_format_template, load_prompts_from_yaml("prompts_gpt_agent_eval.yaml")))
+PROMPTS_GPT_ASSISTANT_EVAL = tuple(map(to_format_template, load_prompts_from_yaml("prompts_gpt_assistant_eval.yaml")))
+SEMANTIC_CACHE_EXTRACTION = hashlib.sha256(json.dumps([MODEL_HEAVY, MODEL_LIGHT, SYSTEM_MESSAGE_AGENT,
+                                                       PROMPTS_GPT_AGENT, PROMPTS_GPT_ASSISTANT]).encode()
+                                           ).hexdigest()  # identifies the models and prompts of the topic extraction,
+# so that the semantic cache only reuses topics of the same extraction
+
+
 def print_messages_history(messages_history_all: List[List[Dict[str, str]]]):
     """
         Print all conversations about all selected publications
@@ -1006,8 +2263,42 @@ def print_messages_history(messages_history_all: List[List[Dict[str, str]]]):
         count += 1
 
 
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="SKGC: Scientific Knowledge Graph Construction")
+    parser.add_argument("--no-cache", action="store_true", help="don't use the response cache, always call the"
+                                                                " OpenAI API")
+    parser.add_argument("--no-resume", action="store_true", help="don't continue an interrupted run, process all"
+                                                                 " selected publications again (the progress is still"
+                                                                 " recorded)")
+    parser.add_argument("--semantic-threshold", type=float, default=0.95,
+                        help="minimum cosine similarity between the embeddings of the title and abstract of two"
+                             " publications to reuse the extracted topics of the former publication (default: 0.95,"
+                             " a value above 1 disables the semantic cache)")
+    parser.add_argument("--batch", action="store_true", help="send the requests to the OpenAI Batch API (50%% cheaper,"
+                                                             " results can take up to 24 hours)")
+    parser.add_argument("--publications-per-prompt", type=int, default=1,
+                        help="number of publications whose topics are extracted together in one conversation with the"
+                             " GPT agent (default: 1, the extraction quality may decrease with larger numbers)")
+    parser.add_argument("--verbose", action="store_true", help="print every step of the conversations instead of"
+                                                               " only the progress bars")
+    args = parser.parse_args()
+    if args.batch and BASE_URL is not None:
+        parser.error("--batch is only available with the OpenAI API, not with OPENAI_BASE_URL")
+    return args
+
+
 def main():
-    load_dotenv()
+    args = parse_arguments()
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+    if not args.no_cache:
+        open_cache(os.path.join(os.path.dirname(__file__), CACHE_FILE_NAME), args.semantic_threshold)
     publications = get_publications_data()
     if not publications:
         print(
@@ -1043,12 +2334,20 @@ def main():
         print("The selected publications are being processed now.")
 
     messages_history_all = list()
+    progress_file_name = os.path.join(os.path.dirname(__file__), PROGRESS_FILE_NAME)  # independent of --no-cache, so
+    # that a run without the response cache can be resumed as well
+    if args.no_resume and os.path.exists(progress_file_name):
+        os.remove(progress_file_name)  # the progress of the former run is discarded, the new run is recorded again
 
-    # step 1: topic extraction
-    publications_and_topics = extract_topics_all(publications, messages_history_all)
-
-    # step 2: evaluation
-    eval_all(publications_and_topics, messages_history_all)
+    # step 1 and 2: topic extraction and evaluation
+    try:
+        publications_and_topics = asyncio.run(run_pipeline(publications, messages_history_all, args.batch,
+                                                           args.publications_per_prompt, progress_file_name))
+    finally:
+        close_cache()
+    if not publications_and_topics:
+        print("No publication could be processed. Please restart the program.")
+        return
 
     # step 3: output results
     # 3.1: print all conversations about all processed publications
@@ -1059,6 +2358,10 @@ def main():
 
     # 3.3: store the final result (SKGC topics and the evaluation metrics for the SKGC and CSOC approach) in a json file
     skgc_topics_and_eval_to_json(publications_and_topics)
+    if (progress_file_name is not None and os.path.exists(progress_file_name)
+            and len(publications_and_topics) == len(publications)):
+        os.remove(progress_file_name)  # the run is complete, the next run starts from the beginning. Otherwise the
+        # next run only processes the skipped publications
 
 
 if __name__ == "__main__":
@@ -0,0 +1,410 @@
+""" LLM response cache for SKGC
+This module provides a persistent exact-match cache for the responses of the OpenAI chat completions API. As all
+calls are made with temperature 0 and a fixed seed, and the prompts are built from fixed YAML templates, sending the
+same request again yields (modulo OpenAI-side non-determinism) the same response. Re-running the pipeline on the same
+publications therefore doesn't need to call the API again.
+
+The cache is stored in an SQLite database. The key of a cache entry is the SHA-256 hash of the complete request
+(model, messages and sampling parameters) serialized as JSON. When the cache is opened, the least recently used
+responses are deleted if the stored responses exceed the maximum size (2 GB by default).
+
+Additionally, this module provides a semantic cache for the results of the whole topic extraction of a publication.
+Many scientific publications have near-duplicate titles and abstracts (preprints, revisions, cross-posts). The
+semantic cache stores an embedding of the title and abstract together with the extracted topics, and returns the
+stored topics for a new publication whose embedding has a cosine similarity of at least the given threshold with the
+embedding of a former publication.
+
+Classes:
+    UncachedResponse: A response that is returned as usual but not stored in the cache.
+
+    ResponseCache: A class to store and look up responses in an SQLite database.
+
+    SemanticCache: A class to store and look up topic extraction results by the similarity of publication embeddings.
+
+Functions:
+    open_cache(file_name: str, semantic_threshold: float, max_size: int) -> ResponseCache: Opens the caches that are
+    used by the cached decorator and the topic extraction.
+
+    close_cache(): Closes the caches.
+
+    get_semantic_cache() -> Optional[SemanticCache]: Returns the opened semantic cache.
+
+    cached(func: Callable[..., Awaitable[str]]) -> Callable[..., Awaitable[str]]: Decorator that looks up the response
+    to a request in the cache before calling the API.
+"""
+
+
+import functools
+import hashlib
+import inspect
+import json
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+
+class UncachedResponse(str):
+    """
+    A response that is returned to the caller as usual but not stored by the cached decorator, e.g. a response that
+    was cut off after the maximum number of tokens. Otherwise, one incomplete answer would be replayed on every later
+    run instead of requesting it again.
+    """
+
+
+class ResponseCache:
+    """
+    A class to store and look up responses of the OpenAI API in an SQLite database.
+
+    Attributes:
+        connection (sqlite3.Connection): The connection to the SQLite database.
+
+    Methods:
+        make_key(request: Dict[str, Any]) -> str:
+            Computes the cache key of a request.
+
+        prune(max_size: int):
+            Deletes the least recently used responses until the stored responses don't exceed the maximum size.
+
+        get(key: str) -> Optional[str]:
+            Returns the cached response for the given key or None.
+
+        set(key: str, response: str):
+            Stores a response under the given key.
+
+        close():
+            Closes the connection to the database.
+    """
+
+    def __init__(self, file_name: str, max_size: int = 2 * 1024 ** 3):
+        """
+        Initializes the ResponseCache class, creates the database table if it doesn't exist yet and deletes the least
+        recently used responses if the maximum size is exceeded.
+
+        Args:
+            file_name (str): The file name of the SQLite database.
+            max_size (int): The maximum size of the stored responses in bytes.
+        """
+        self.connection = sqlite3.connect(file_name)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+                                " last_used REAL NOT NULL DEFAULT 0)")
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(responses)")]
+        if "last_used" not in columns:  # cache created by a former version
+            self.connection.execute("ALTER TABLE responses ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+        self.connection.commit()
+        self.prune(max_size)
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """
+        Computes the cache key of a request.
+
+        Args:
+            request (Dict[str, Any]): The parameters of the request (model, messages, temperature, seed, ...).
+
+        Returns:
+            key (str): The SHA-256 hash of the request serialized as JSON.
+        """
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+    def prune(self, max_size: int):
+        """
+        Deletes the least recently used responses until the stored responses don't exceed the maximum size. The size is
+        only checked here (when the cache is opened), not with every stored response.
+
+        Args:
+            max_size (int): The maximum size of the stored responses in bytes.
+        """
+        self.connection.execute("DELETE FROM responses WHERE key IN (SELECT key FROM (SELECT key, SUM(LENGTH(key)"
+                                " + LENGTH(CAST(response AS BLOB))) OVER (ORDER BY last_used DESC) AS size FROM"
+                                " responses) WHERE size > ?)", (max_size,))
+        self.connection.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached response for the given key.
+
+        Args:
+            key (str): The cache key of the request.
+
+        Returns:
+            response (Optional[str]): The cached response or None if the request is not cached.
+        """
+        row = self.connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))  # committed
+        # together with the next stored response or when the cache is closed
+        return row[0]
+
+    def set(self, key: str, response: str):
+        """
+        Stores a response under the given key.
+
+        Args:
+            key (str): The cache key of the request.
+            response (str): The response to store.
+        """
+        self.connection.execute("INSERT OR REPLACE INTO responses (key, response, last_used) VALUES (?, ?, ?)",
+                                (key, response, time.time()))
+        self.connection.commit()
+
+    def close(self):
+        """
+        Closes the connection to the database.
+        """
+        self.connection.commit()
+        self.connection.close()
+
+
+class SemanticCache:
+    """
+    A class to store and look up topic extraction results by the cosine similarity of publication embeddings. The
+    entries are stored in an SQLite database, the embeddings are additionally kept in memory as one matrix per embedding
+    model, dimension and extraction so that a look-up is a single matrix-vector product. Each entry records the
+    embedding model and the extraction (the models and prompts of the topic extraction), so that embeddings of another
+    model or dimension aren't compared and results of other models or prompts aren't reused.
+
+    Attributes:
+        connection (sqlite3.Connection): The connection to the SQLite database.
+        threshold (float): The minimum cosine similarity for a cache hit.
+        keys (Set[str]): The keys of all entries.
+        embeddings (Dict[Tuple[str, str, int], Tuple[List[str], np.ndarray]]): The keys and the normalized embeddings
+        (one row per entry) of the entries of each embedding model, extraction and dimension.
+
+    Methods:
+        make_key(text: str, extraction: str) -> str:
+            Computes the key of a publication text for an extraction.
+
+        get_exact(key: str) -> Optional[Tuple[List[str], List[Dict[str, str]]]]:
+            Returns the entry stored for exactly the same publication text and extraction or None.
+
+        get_similar(embedding: List[float], embedding_model: str, extraction: str)
+        -> Optional[Tuple[List[str], List[Dict[str, str]]]]:
+            Returns the entry of the same extraction with the most similar embedding if its similarity reaches the
+            threshold, or None.
+
+        set(key: str, embedding: List[float], embedding_model: str, extraction: str, topics: List[str],
+        messages_history: List[Dict[str, str]]):
+            Stores an entry.
+
+        close():
+            Closes the connection to the database.
+    """
+
+    def __init__(self, file_name: str, threshold: float):
+        """
+        Initializes the SemanticCache class, creates the database table if it doesn't exist yet and loads all stored
+        embeddings.
+
+        Args:
+            file_name (str): The file name of the SQLite database.
+            threshold (float): The minimum cosine similarity for a cache hit.
+        """
+        self.connection = sqlite3.connect(file_name)
+        self.connection.execute("DROP TABLE IF EXISTS publications")  # entries of former versions without the
+        # embedding model and the extraction can't be matched safely
+        self.connection.execute("CREATE TABLE IF NOT EXISTS extractions (key TEXT PRIMARY KEY, embedding_model TEXT"
+                                " NOT NULL, extraction TEXT NOT NULL, embedding BLOB NOT NULL, topics TEXT NOT NULL,"
+                                " messages_history TEXT NOT NULL)")
+        self.connection.commit()
+        self.threshold = threshold
+        self.keys = set()
+        self.embeddings = dict()
+        rows = self.connection.execute("SELECT key, embedding_model, extraction, embedding FROM extractions")
+        for key, embedding_model, extraction, embedding in rows:
+            self._add(key, embedding_model, extraction, np.frombuffer(embedding, dtype=np.float32))
+
+    def _add(self, key: str, embedding_model: str, extraction: str, vector: np.ndarray):
+        """
+        Adds a normalized embedding to the in-memory matrix of its embedding model, extraction and dimension.
+
+        Args:
+            key (str): The key of the entry.
+            embedding_model (str): The embedding model of the embedding.
+            extraction (str): The extraction of the entry.
+            vector (np.ndarray): The normalized embedding.
+        """
+        group = (embedding_model, extraction, vector.shape[0])
+        keys, matrix = self.embeddings.get(group, (list(), np.empty((0, vector.shape[0]), dtype=np.float32)))
+        self.embeddings[group] = (keys + [key], np.vstack([matrix, vector]))
+        self.keys.add(key)
+
+    @staticmethod
+    def make_key(text: str, extraction: str) -> str:
+        """
+        Computes the key of a publication text for an extraction.
+
+        Args:
+            text (str): The title and abstract of the publication.
+            extraction (str): The identifier of the models and prompts of the topic extraction.
+
+        Returns:
+            key (str): The SHA-256 hash of the extraction and the text.
+        """
+        return hashlib.sha256(json.dumps([extraction, text]).encode()).hexdigest()
+
+    def _get(self, key: str) -> Tuple[List[str], List[Dict[str, str]]]:
+        """
+        Returns the entry stored under the given key.
+
+        Args:
+            key (str): The key of the entry.
+
+        Returns:
+            Tuple[List[str], List[Dict[str, str]]]: The extracted topics and the messages history of the extraction.
+        """
+        topics, messages_history = self.connection.execute("SELECT topics, messages_history FROM extractions WHERE"
+                                                           " key = ?", (key,)).fetchone()
+        return json.loads(topics), json.loads(messages_history)
+
+    def get_exact(self, key: str) -> Optional[Tuple[List[str], List[Dict[str, str]]]]:
+        """
+        Returns the entry stored for exactly the same publication text and extraction. This look-up doesn't need an
+        embedding.
+
+        Args:
+            key (str): The key of the publication text.
+
+        Returns:
+            Optional[Tuple[List[str], List[Dict[str, str]]]]: The extracted topics and the messages history of the
+            extraction, or None if the publication text is not cached.
+        """
+        if key not in self.keys:
+            return None
+        return self._get(key)
+
+    def get_similar(self, embedding: List[float], embedding_model: str, extraction: str
+                    ) -> Optional[Tuple[List[str], List[Dict[str, str]]]]:
+        """
+        Returns the entry with the most similar embedding if its cosine similarity reaches the threshold. Only the
+        entries of the same embedding model, dimension and extraction are compared.
+
+        Args:
+            embedding (List[float]): The embedding of the publication text.
+            embedding_model (str): The embedding model of the embedding.
+            extraction (str): The identifier of the models and prompts of the topic extraction.
+
+        Returns:
+            Optional[Tuple[List[str], List[Dict[str, str]]]]: The extracted topics and the messages history of the
+            extraction, or None if there is no similar entry.
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        keys, matrix = self.embeddings.get((embedding_model, extraction, query.shape[0]), (None, None))
+        if not keys:
+            return None
+        similarities = matrix @ (query / np.linalg.norm(query))  # rows are normalized already
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        return self._get(keys[best])
+
+    def set(self, key: str, embedding: List[float], embedding_model: str, extraction: str, topics: List[str],
+            messages_history: List[Dict[str, str]]):
+        """
+        Stores an entry.
+
+        Args:
+            key (str): The key of the publication text.
+            embedding (List[float]): The embedding of the publication text.
+            embedding_model (str): The embedding model of the embedding.
+            extraction (str): The identifier of the models and prompts of the topic extraction.
+            topics (List[str]): The extracted topics.
+            messages_history (List[Dict[str, str]]): The messages history of the extraction.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / np.linalg.norm(vector)
+        self.connection.execute("INSERT OR REPLACE INTO extractions (key, embedding_model, extraction, embedding,"
+                                " topics, messages_history) VALUES (?, ?, ?, ?, ?, ?)",
+                                (key, embedding_model, extraction, vector.tobytes(), json.dumps(topics),
+                                 json.dumps(messages_history)))
+        self.connection.commit()
+        if key not in self.keys:
+            self._add(key, embedding_model, extraction, vector)
+
+    def close(self):
+        """
+        Closes the connection to the database.
+        """
+        self.connection.close()
+
+
+_cache: Optional[ResponseCache] = None  # cache used by the cached decorator, None if caching is disabled
+_semantic_cache: Optional[SemanticCache] = None  # cache used by the topic extraction, None if disabled
+
+
+def open_cache(file_name: str, semantic_threshold: float = 0.95, max_size: int = 2 * 1024 ** 3) -> ResponseCache:
+    """
+    Opens the cache that is used by the cached decorator and the semantic cache that is used by the topic extraction.
+    As long as no cache is opened, the decorated functions always call the API.
+
+    Args:
+        file_name (str): The file name of the SQLite database.
+        semantic_threshold (float): The minimum cosine similarity for a hit of the semantic cache. With a value above 1,
+        the semantic cache is not used.
+        max_size (int): The maximum size of the stored responses in bytes.
+
+    Returns:
+        cache (ResponseCache): The opened cache.
+    """
+    global _cache, _semantic_cache
+    _cache = ResponseCache(file_name, max_size)
+    if semantic_threshold <= 1:
+        _semantic_cache = SemanticCache(file_name, semantic_threshold)
+    return _cache
+
+
+def close_cache():
+    """
+    Closes the cache that is used by the cached decorator and the semantic cache.
+    """
+    global _cache, _semantic_cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+    if _semantic_cache is not None:
+        _semantic_cache.close()
+        _semantic_cache = None
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Returns the opened semantic cache.
+
+    Returns:
+        Optional[SemanticCache]: The semantic cache or None if it is not used.
+    """
+    return _semantic_cache
+
+
+def cached(func: Callable[..., Awaitable[str]]) -> Callable[..., Awaitable[str]]:
+    """
+    Decorator that looks up the response to a request in the cache before calling the API. All arguments of the
+    decorated function (including default values) except the OpenAI client form the request and therefore the cache
+    key. Arguments that are None are left out, so that new optional parameters don't change the keys of the cached
+    requests. Only successful responses are stored: exceptions are passed on, and empty responses and responses marked
+    as UncachedResponse (e.g. cut off) are returned, without storing anything.
+
+    Args:
+        func (Callable[..., Awaitable[str]]): The coroutine function that sends the request to the API.
+
+    Returns:
+        wrapper (Callable[..., Awaitable[str]]): The decorated coroutine function.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if _cache is None:
+            return await func(*args, **kwargs)
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        request = {name: value for name, value in arguments.arguments.items() if name != "client" and value is not None}
+        key = ResponseCache.make_key(request)
+        response = _cache.get(key)
+        if response is None:
+            response = await func(*args, **kwargs)
+            if response and not isinstance(response, UncachedResponse):
+                _cache.set(key, response)
+        return response
+    return wrapper
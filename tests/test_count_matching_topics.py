@@ -0,0 +1,54 @@
+""" Tests of the local count of the matching keywords (count_matching_topics) of the evaluation.
+Run from the repository root with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from SKGC import count_matching_topics, keywords_match, normalize_keyword  # noqa: E402
+
+
+class CountMatchingTopicsTest(unittest.TestCase):
+    def test_empty_keywords_are_left_out(self):
+        self.assertEqual(count_matching_topics([""], ["machine learning", "ontology"]), 0)
+        self.assertEqual(count_matching_topics(["ontology", " "], ["machine learning", "ontology", ""]), 1)
+
+    def test_single_word_is_not_a_prefix_match(self):
+        self.assertFalse(keywords_match("data", "data mining"))
+        self.assertFalse(keywords_match("machine", "machine learning"))
+        self.assertEqual(count_matching_topics(["data", "machine"], ["data mining", "machine learning"]), 0)
+
+    def test_prefix_match_of_several_words(self):
+        self.assertTrue(keywords_match("semantic web", "semantic web service"))
+
+    def test_plural_and_spelling(self):
+        self.assertEqual(normalize_keyword("Social Networks"), "social network")
+        self.assertEqual(count_matching_topics(["colaborative filtering", "personalizations"],
+                                               ["collaborative filtering", "personalization"]), 2)
+
+    def test_examples_of_the_evaluation_prompts(self):
+        skgc_topics = ["recommendation algorithms", "factorization", "collaborative filtering techniques",
+                       "recommendation systems", "collaborative filtering", "regularization", "recommender systems",
+                       "matrix algebra", "information retrieval", "matrix factorizations", "social networks",
+                       "social relationships", "empirical analysis", "social relations", "image reconstruction",
+                       "numerical model", "world wide web"]
+        gold_standard = ["recommendation algorithms", "factorization", "collaborative filtering techniques",
+                         "recommendation systems", "collaborative filtering", "regularization", "recommender systems",
+                         "matrix algebra", "information retrieval", "matrix factorization", "social network",
+                         "context-aware recommender systems"]
+        self.assertEqual(count_matching_topics(skgc_topics, gold_standard), 11)
+        skgc_topics = ["metadata", "social bookmarking", "folksonomies", "web page", "semantic web", "user interfaces",
+                       "web 2.0", "world wide web", "personalizations", "semantics", "search engines",
+                       "social networks", "software architecture", "electronic commerce", "viewpoint"]
+        gold_standard = ["metadata", "social bookmarking", "folksonomies", "web page", "semantic web",
+                         "user interfaces", "web 2.0", "world wide web", "personalization", "semantic desktop",
+                         "information retrieval", "ontology", "information management"]
+        self.assertEqual(count_matching_topics(skgc_topics, gold_standard), 9)  # 10 in the prompt, "semantics" and
+        # "semantic desktop" don't match locally
+
+
+if __name__ == "__main__":
+    unittest.main()
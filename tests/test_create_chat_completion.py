@@ -0,0 +1,71 @@
+""" Tests of the request to the chat completions API (create_chat_completion) with a real OpenAI client whose HTTP
+requests are answered by an httpx.MockTransport instead of the OpenAI API.
+Run from the repository root with: python -m unittest discover tests
+"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+import httpx
+from openai import AsyncOpenAI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import SKGC  # noqa: E402
+from llm_cache import UncachedResponse  # noqa: E402
+
+
+def stream_body(content: str, finish_reason: str) -> bytes:
+    """
+    Builds the server-sent events of a streamed chat completion: the content in two chunks, the finish reason and the
+    usage of the request.
+    """
+    chunks = [{"choices": [{"index": 0, "delta": {"content": content[:3]}, "finish_reason": None}]},
+              {"choices": [{"index": 0, "delta": {"content": content[3:]}, "finish_reason": finish_reason}]},
+              {"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}}]
+    header = {"id": "test", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o"}
+    events = [f"data: {json.dumps({**header, **chunk})}\n\n" for chunk in chunks]
+    return ("".join(events) + "data: [DONE]\n\n").encode()
+
+
+class CreateChatCompletionTest(unittest.TestCase):
+    def request(self, finish_reason: str) -> str:
+        requests = list()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=stream_body("topic a, topic b", finish_reason),
+                                  headers={"content-type": "text/event-stream",
+                                           "x-ratelimit-remaining-requests": "499",
+                                           "x-ratelimit-remaining-tokens": "29000",
+                                           "x-ratelimit-reset-requests": "120ms",
+                                           "x-ratelimit-reset-tokens": "2s"})
+
+        async def run() -> str:
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+                client = AsyncOpenAI(api_key="test", http_client=http_client, max_retries=0)
+                return await SKGC.create_chat_completion(client, [{"role": "user", "content": "Hello"}],
+                                                         model="gpt-4o", max_tokens=20)
+
+        response = asyncio.run(run())
+        self.assertEqual(len(requests), 1)
+        self.assertTrue(requests[0]["stream"])
+        self.assertEqual(requests[0]["max_tokens"], 20)
+        return response
+
+    def test_streamed_response_is_collected(self):
+        response = self.request("stop")
+        self.assertEqual(response, "topic a, topic b")
+        self.assertNotIsInstance(response, UncachedResponse)
+
+    def test_cut_off_response_is_not_cached(self):
+        response = self.request("length")
+        self.assertEqual(response, "topic a, topic b")
+        self.assertIsInstance(response, UncachedResponse)
+
+
+if __name__ == "__main__":
+    unittest.main()
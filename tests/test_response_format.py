@@ -0,0 +1,41 @@
+""" Tests of the local check of the output format of the GPT agent's answers and of the parsing of the ordered lists.
+Run from the repository root with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from SKGC import COMMA_SEPARATED_LIST_FORMAT, PublicationParseError, split_ordered_lists  # noqa: E402
+
+
+class CommaSeparatedListFormatTest(unittest.TestCase):
+    def test_keyword_lists(self):
+        for response in ("collaborative filtering, recommender systems, matrix factorization",
+                         "web 2.0, world wide web", "C++, C#", "question answering (QA), semantic web",
+                         "R&D, O'Reilly media, TCP/IP"):
+            self.assertIsNotNone(COMMA_SEPARATED_LIST_FORMAT.fullmatch(response), response)
+
+    def test_prose_is_rejected(self):
+        for response in ("The keywords are machine learning, ontology", "Sure, here are the keywords",
+                         "Keywords: machine learning, ontology", "machine learning, ontology.",
+                         "I extracted the following keywords from the abstract because they seem to be relevant",
+                         "machine learning\nontology", "machine learning,, ontology", "###"):
+            self.assertIsNone(COMMA_SEPARATED_LIST_FORMAT.fullmatch(response), response)
+
+
+class SplitOrderedListsTest(unittest.TestCase):
+    def test_lists_are_split(self):
+        response = "Your result: metadata, semantics\nHuman expert result: metadata, semantic desktop"
+        self.assertEqual(split_ordered_lists(response, "Your result"),
+                         (["metadata", "semantics"], ["metadata", "semantic desktop"]))
+
+    def test_missing_list_raises(self):
+        with self.assertRaises(PublicationParseError):
+            split_ordered_lists("metadata, semantics", "CSOC result")
+
+
+if __name__ == "__main__":
+    unittest.main()
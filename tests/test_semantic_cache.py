@@ -0,0 +1,53 @@
+""" Tests of the semantic cache of the topic extraction (SemanticCache).
+Run from the repository root with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from llm_cache import SemanticCache  # noqa: E402
+
+
+class SemanticCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.directory.name, "cache.sqlite3")
+        self.cache = SemanticCache(self.file_name, 0.95)
+        self.key = SemanticCache.make_key("Title\nAbstract", "extraction 1")
+        self.cache.set(self.key, [1.0, 0.0, 0.0], "embedding 1", "extraction 1", ["topic a"],
+                       [{"role": "system", "content": "Hello"}])
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_key_depends_on_extraction(self):
+        self.assertIsNotNone(self.cache.get_exact(self.key))
+        self.assertIsNone(self.cache.get_exact(SemanticCache.make_key("Title\nAbstract", "extraction 2")))
+
+    def test_similar_entry_of_same_extraction(self):
+        topics, _ = self.cache.get_similar([0.99, 0.01, 0.0], "embedding 1", "extraction 1")
+        self.assertEqual(topics, ["topic a"])
+        self.assertIsNone(self.cache.get_similar([0.99, 0.01, 0.0], "embedding 1", "extraction 2"))
+
+    def test_other_embedding_model_or_dimension_is_not_compared(self):
+        self.assertIsNone(self.cache.get_similar([1.0, 0.0, 0.0], "embedding 2", "extraction 1"))
+        self.assertIsNone(self.cache.get_similar([1.0, 0.0, 0.0, 0.0], "embedding 1", "extraction 1"))
+        key = SemanticCache.make_key("Other title\nAbstract", "extraction 1")
+        self.cache.set(key, [0.0, 1.0, 0.0, 0.0], "embedding 1", "extraction 1", ["topic b"], [])
+        topics, _ = self.cache.get_similar([0.0, 1.0, 0.0, 0.0], "embedding 1", "extraction 1")
+        self.assertEqual(topics, ["topic b"])
+
+    def test_entries_are_loaded_from_the_database(self):
+        self.cache.close()
+        self.cache = SemanticCache(self.file_name, 0.95)
+        topics, _ = self.cache.get_similar([1.0, 0.0, 0.0], "embedding 1", "extraction 1")
+        self.assertEqual(topics, ["topic a"])
+
+
+if __name__ == "__main__":
+    unittest.main()